@@ -72,6 +72,18 @@ def getDictValue(dict, key):
         return None
     return value
 
+## @brief reverse dictionnary of an enum dictionnary
+# the first key is kept for a value shared by several keys, as getDictKey does
+#@return None if some values are not hashable
+def getReverseDict(dict):
+    reverse = {}
+    try:
+        for key, value in dict.items():
+            reverse.setdefault(value, key)
+    except TypeError:
+        return None
+    return reverse
+
 #preserve the case of key
 def getDictCaseValue(dict, key):
     try:
@@ -84,10 +96,14 @@ def getDictCaseValue(dict, key):
 class CallableReadEnum:
     def __init__(self,dictionnary,func2Call) :
         self.__dict = dictionnary
+        self.__reverse = getReverseDict(dictionnary)
         self.__func2Call = func2Call
 
     def __call__(self,attr) :
-        value = getDictKey(self.__dict,self.__func2Call())
+        if self.__reverse is not None:
+            value = self.__reverse.get(self.__func2Call())
+        else:
+            value = getDictKey(self.__dict,self.__func2Call())
         attr.set_value(value)
 
 ## @brief Class for genenic write_<attribute> with enum value
@@ -98,11 +114,11 @@ class CallableWriteEnum:
         self.__func2Call = func2Call
         
     def __call__(self,attr) :
-        data = attr.get_write_value()
-        value = getDictValue(self.__dict,data.upper())
+        data = attr.get_write_value().upper()
+        value = getDictCaseValue(self.__dict,data)
         if value is None:
             PyTango.Except.throw_exception('WrongData',\
-                                           'Wrong value %s: %s'%(self.__attr_name,data.upper()),\
+                                           'Wrong value %s: %s'%(self.__attr_name,data),\
                                            'LimaCCD Class')
         else:
             self.__func2Call(value)
@@ -126,7 +142,7 @@ class CallableWrite:
         value = attr.get_write_value()
         if value is None:
             PyTango.Except.throw_exception('WrongData',\
-                                           'Wrong value %s: %s'%(self.__attr_name,data.upper()),\
+                                           'Wrong value %s: %s'%(self.__attr_name,value),\
                                            'LimaCCD Class')
         else:
             self.__func2Call(value)
@@ -0,0 +1,437 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2017
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+#============================================================================
+#                              BENCHMARK
+#============================================================================
+#
+# Measure the frames/s and the latency of the Tango data paths of the
+# server, with the Simulator camera.
+#
+# A local Tango database (PyTango databaseds with sqlite) is started in a
+# temporary directory unless --tango-host is given, so no external service
+# is needed. For each image size and pixel type, EDF frames are generated
+# and loaded by the Simulator (LOADER_PREFETCH mode), then a LimaCCDs
+# server is started and each benchmark is run against it.
+#
+# The results are written as JSON:
+#  {"version" : 1, "date" : ..., "host" : ..., "options" : {...},
+#   "results" : [{"case" : {"width", "height", "type"},
+#                 "benchmarks" : {name : {"fps", "latency" : {"p50",
+#                                 "p99", "max", "mean"}, ...}}}]}
+#
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+
+import numpy
+import PyTango
+
+from Lima.Server import EdfFile
+
+BenchmarkVersion = 1
+
+DefaultSizes = [256, 1024, 2048]
+DefaultTypes = ['uint8', 'uint16', 'uint32']
+DefaultNbFrames = 100
+DefaultRepeat = 100
+DefaultExpoTime = 0.001
+
+ServerInstance = 'benchmark'
+ServerName = 'LimaCCDs/' + ServerInstance
+LimaDeviceName = 'benchmark/limaccds/simulator'
+SimulatorDeviceName = 'benchmark/simulator/simulator'
+
+# as named by export_default_plugins
+def _plugin_device_name(plugin_type):
+    beamline, _, camera = LimaDeviceName.split('/')
+    return '%s/%s/%s' % (beamline, plugin_type, camera)
+
+def _latency_stats(latencies):
+    latencies = numpy.asarray(latencies, dtype=numpy.float64)
+    if not len(latencies):
+        return None
+    p50, p99 = numpy.percentile(latencies, (50, 99))
+    return {'p50' : float(p50),
+            'p99' : float(p99),
+            'max' : float(latencies.max()),
+            'mean' : float(latencies.mean())}
+
+def _time_calls(func, nb):
+    latencies = []
+    t0 = time.time()
+    for i in range(nb):
+        t = time.time()
+        func(i)
+        latencies.append(time.time() - t)
+    total = time.time() - t0
+    return {'nb' : nb,
+            'fps' : nb / total if total > 0 else None,
+            'latency' : _latency_stats(latencies)}
+
+def _free_port():
+    s = socket.socket()
+    try:
+        s.bind(('', 0))
+        return s.getsockname()[1]
+    finally:
+        s.close()
+
+def _wait(predicate, timeout, period=0.01):
+    te = time.time() + timeout
+    while not predicate():
+        if time.time() > te:
+            raise RuntimeError('Timeout')
+        time.sleep(period)
+
+##@brief a Tango database run in a temporary directory
+class LocalTangoDatabase:
+    def __init__(self, directory):
+        self.__directory = directory
+        self.__process = None
+        self.tango_host = None
+
+    def start(self, timeout=30):
+        port = _free_port()
+        self.tango_host = '%s:%d' % (socket.gethostname(), port)
+        self.__process = subprocess.Popen(
+            [sys.executable, '-m', 'tango.databaseds.database',
+             '--port=%d' % port, '2'],
+            cwd=self.__directory, env=self.env())
+        def is_running():
+            try:
+                PyTango.Database(socket.gethostname(), port).get_info()
+                return True
+            except PyTango.DevFailed:
+                return False
+        _wait(is_running, timeout, 0.2)
+        os.environ['TANGO_HOST'] = self.tango_host
+
+    def env(self):
+        env = dict(os.environ)
+        if self.tango_host:
+            env['TANGO_HOST'] = self.tango_host
+        return env
+
+    def stop(self):
+        if self.__process is not None:
+            self.__process.terminate()
+            self.__process.wait()
+            self.__process = None
+
+##@brief a LimaCCDs server with the Simulator camera
+class LimaServer:
+    def __init__(self, db, extra_args=()):
+        self.__db = db
+        self.__process = None
+        self.__extra_args = list(extra_args)
+
+    def register(self, simulator_properties):
+        db = PyTango.Database()
+        for dev_name, class_name in ((LimaDeviceName, 'LimaCCDs'),
+                                     (SimulatorDeviceName, 'Simulator')):
+            info = PyTango.DbDevInfo()
+            info.name = dev_name
+            info._class = class_name
+            info.server = ServerName
+            db.add_device(info)
+        db.put_device_property(LimaDeviceName,
+                               {'LimaCameraType' : ['Simulator'],
+                                'TangoEvent' : ['True']})
+        db.put_device_property(SimulatorDeviceName, simulator_properties)
+
+    def start(self, timeout=60):
+        self.__process = subprocess.Popen(
+            [sys.executable, '-c',
+             'from Lima.Server.LimaCCDs import main; main()',
+             ServerInstance] + self.__extra_args,
+            env=self.__db.env())
+        def is_running():
+            try:
+                PyTango.DeviceProxy(LimaDeviceName).ping()
+                return True
+            except PyTango.DevFailed:
+                return False
+        _wait(is_running, timeout, 0.2)
+        return PyTango.DeviceProxy(LimaDeviceName)
+
+    def stop(self):
+        if self.__process is not None:
+            self.__process.terminate()
+            self.__process.wait()
+            self.__process = None
+
+##@brief write the frames loaded by the Simulator
+def write_frames(directory, width, height, dtype, nb_frames=4):
+    dtype = numpy.dtype(dtype)
+    info = numpy.iinfo(dtype)
+    pattern = os.path.join(directory, 'frame_%dx%d_%s_*.edf' % (width, height,
+                                                                  dtype.name))
+    for i in range(nb_frames):
+        data = numpy.random.randint(0, min(info.max, 2 ** 16),
+                                    size=(height, width)).astype(dtype)
+        f = EdfFile.EdfFile(pattern.replace('*', '%04d' % i), access='wb')
+        f.WriteImage({}, data)
+    return pattern
+
+def acquire(lima, nb_frames, expo_time, timeout=600):
+    lima.write_attribute('acq_nb_frames', nb_frames)
+    lima.write_attribute('acq_expo_time', expo_time)
+    lima.prepareAcq()
+    t0 = time.time()
+    lima.startAcq()
+    _wait(lambda: lima.read_attribute('last_image_ready').value == nb_frames - 1,
+          timeout)
+    return time.time() - t0
+
+#----------------------------------------------------------------------------
+#                              Benchmarks
+#----------------------------------------------------------------------------
+def bench_acquisition(lima, options):
+    duration = acquire(lima, options.frames, options.expo_time)
+    return {'nb' : options.frames, 'fps' : options.frames / duration}
+
+def bench_readImage(lima, options):
+    acquire(lima, options.frames, options.expo_time)
+    nb = options.frames
+    return _time_calls(lambda i: lima.readImage(i % nb), options.repeat)
+
+def bench_readImageSeq(lima, options):
+    acquire(lima, options.frames, options.expo_time)
+    chunk = options.seq_chunk
+    nb_chunks = max(1, options.frames // chunk)
+    result = _time_calls(lambda i: lima.readImageSeq([(i % nb_chunks) * chunk,
+                                                      (i % nb_chunks + 1) * chunk]),
+                         options.repeat)
+    result['frames_per_call'] = chunk
+    if result['fps']:
+        result['frame_fps'] = result['fps'] * chunk
+    return result
+
+def _bench_events(lima, options, attr_name, setup):
+    received = []
+    lock = threading.Lock()
+    def cb(event):
+        if not event.err:
+            with lock:
+                received.append(time.time())
+    setup()
+    event_id = lima.subscribe_event(attr_name, PyTango.EventType.CHANGE_EVENT, cb)
+    try:
+        with lock:
+            del received[:]
+        t0 = time.time()
+        duration = acquire(lima, options.frames, options.expo_time)
+        time.sleep(options.event_grace)
+    finally:
+        lima.unsubscribe_event(event_id)
+    with lock:
+        times = list(received)
+    result = {'nb_frames' : options.frames,
+              'nb_events' : len(times),
+              'acq_duration' : duration}
+    if len(times) > 1:
+        result['fps'] = (len(times) - 1) / (times[-1] - times[0])
+        result['period'] = _latency_stats(numpy.diff(times))
+        result['last_event_delay'] = times[-1] - (t0 + duration)
+    return result
+
+def bench_last_image_events(lima, options):
+    def setup():
+        lima.write_attribute('image_events_push_data', True)
+        lima.write_attribute('image_events_max_rate', 1000.)
+    result = _bench_events(lima, options, 'last_image', setup)
+    lima.write_attribute('image_events_push_data', False)
+    result['server_latency'] = list(lima.read_attribute('image_events_latency').value)
+    return result
+
+def bench_video_events(lima, options):
+    def setup():
+        lima.write_attribute('video_active', True)
+    result = _bench_events(lima, options, 'video_last_image', setup)
+    lima.write_attribute('video_active', False)
+    return result
+
+def bench_roicounter_readCounters(lima, options):
+    roi = PyTango.DeviceProxy(_plugin_device_name('roicounter'))
+    width = lima.read_attribute('image_width').value
+    height = lima.read_attribute('image_height').value
+    roi.Stop()
+    roi_ids = roi.addNames(['bench%d' % i for i in range(options.nb_rois)])
+    rois = []
+    for roi_id in roi_ids:
+        rois += [roi_id, 0, 0, width // 2, height // 2]
+    roi.setRois(rois)
+    roi.Start()
+    try:
+        acquire(lima, options.frames, options.expo_time)
+        _wait(lambda: lima.read_attribute('last_counter_ready').value == options.frames - 1,
+              60)
+        result = _time_calls(lambda i: roi.readCounters(0), options.repeat)
+        result['nb_rois'] = options.nb_rois
+        return result
+    finally:
+        roi.Stop()
+        roi.clearAllRois()
+
+def bench_bpm_bvdata(lima, options):
+    bpm = PyTango.DeviceProxy(_plugin_device_name('bpm'))
+    bpm.Start()
+    try:
+        acquire(lima, options.frames, options.expo_time)
+        return _time_calls(lambda i: bpm.read_attribute('bvdata'),
+                           options.repeat)
+    finally:
+        bpm.Stop()
+
+def bench_saving_edf(lima, options):
+    directory = tempfile.mkdtemp(prefix='lima_bench_saving_')
+    try:
+        lima.write_attribute('saving_directory', directory)
+        lima.write_attribute('saving_prefix', 'bench_')
+        lima.write_attribute('saving_suffix', '.edf')
+        lima.write_attribute('saving_format', 'EDF')
+        lima.write_attribute('saving_overwrite_policy', 'OVERWRITE')
+        lima.write_attribute('saving_mode', 'AUTO_FRAME')
+        t0 = time.time()
+        acquire(lima, options.frames, options.expo_time)
+        _wait(lambda: lima.read_attribute('last_image_saved').value == options.frames - 1,
+              600)
+        duration = time.time() - t0
+        size = sum([os.path.getsize(os.path.join(directory, f))
+                    for f in os.listdir(directory)])
+        return {'nb' : options.frames,
+                'fps' : options.frames / duration,
+                'bytes_per_second' : size / duration,
+                'saving_statistics' : list(lima.read_attribute('saving_statistics').value)}
+    finally:
+        lima.write_attribute('saving_mode', 'MANUAL')
+        shutil.rmtree(directory, ignore_errors=True)
+
+Benchmarks = [('acquisition', bench_acquisition),
+              ('readImage', bench_readImage),
+              ('readImageSeq', bench_readImageSeq),
+              ('last_image_events', bench_last_image_events),
+              ('video_events', bench_video_events),
+              ('roicounter_readCounters', bench_roicounter_readCounters),
+              ('bpm_bvdata', bench_bpm_bvdata),
+              ('saving_edf', bench_saving_edf)]
+
+def run_case(db, options, directory, width, height, dtype):
+    pattern = write_frames(directory, width, height, dtype)
+    server = LimaServer(db, options.server_args)
+    server.register({'mode' : ['LOADER_PREFETCH'],
+                     'file_pattern' : [pattern],
+                     'nb_prefetched_frames' : [str(min(options.frames, 100))]})
+    results = {}
+    lima = server.start()
+    try:
+        lima.set_timeout_millis(60000)
+        for name, bench in Benchmarks:
+            if options.benchmarks and name not in options.benchmarks:
+                continue
+            try:
+                results[name] = bench(lima, options)
+            except Exception as e:
+                results[name] = {'error' : str(e)}
+            if options.verbose:
+                print('%dx%d %s %s: %s' % (width, height, dtype, name,
+                                          json.dumps(results[name])))
+        case = {'width' : width, 'height' : height, 'type' : dtype,
+                'image_type' : lima.read_attribute('image_type').value}
+    finally:
+        server.stop()
+    return {'case' : case, 'benchmarks' : results}
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark of the LimaCCDs Tango data paths with the '
+        'Simulator camera, results are written as JSON')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DefaultSizes,
+                        help='square image sizes in pixel')
+    parser.add_argument('--types', nargs='+', default=DefaultTypes,
+                        help='numpy pixel types')
+    parser.add_argument('--frames', type=int, default=DefaultNbFrames,
+                        help='nb of frames per acquisition')
+    parser.add_argument('--repeat', type=int, default=DefaultRepeat,
+                        help='nb of calls of the read benchmarks')
+    parser.add_argument('--expo-time', type=float, default=DefaultExpoTime)
+    parser.add_argument('--seq-chunk', type=int, default=10,
+                        help='nb of frames per readImageSeq call')
+    parser.add_argument('--nb-rois', type=int, default=16)
+    parser.add_argument('--event-grace', type=float, default=1.,
+                        help='time in second waiting for the last events')
+    parser.add_argument('--benchmarks', nargs='+',
+                        choices=[name for name, bench in Benchmarks],
+                        help='run only these benchmarks')
+    parser.add_argument('--tango-host',
+                        help='use this Tango database instead of a local one')
+    parser.add_argument('--server-arg', dest='server_args', action='append',
+                        default=[],
+                        help='extra LimaCCDs argument, e.g. --server-arg=-v4')
+    parser.add_argument('-o', '--output', help='JSON file, default is stdout')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    options = parser.parse_args(args)
+
+    directory = tempfile.mkdtemp(prefix='lima_bench_')
+    db = LocalTangoDatabase(directory)
+    try:
+        if options.tango_host:
+            db.tango_host = options.tango_host
+            os.environ['TANGO_HOST'] = options.tango_host
+        else:
+            db.start()
+        results = []
+        for size in options.sizes:
+            for dtype in options.types:
+                results.append(run_case(db, options, directory,
+                                        size, size, dtype))
+    finally:
+        db.stop()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    report = {'version' : BenchmarkVersion,
+              'date' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'host' : platform.node(),
+              'python' : platform.python_version(),
+              'pytango' : PyTango.__version__,
+              'options' : vars(options),
+              'results' : results}
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2017
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+#============================================================================
+#                              HELPERS
+#============================================================================
+#
+# Compression of the DATA_ARRAY DevEncoded.
+# A compressed DATA_ARRAY keeps the plain DATA_ARRAY header (so the client
+# knows the dimensions and the type before decompressing) followed by a
+# compression header, the size of each compressed chunk and the chunks:
+#
+#struct {
+  #unsigned int Magic= 0x44544143;
+  #unsigned short Version;
+  #unsigned short HeaderLength;
+  #unsigned int Codec;               // 1-LZ4, 2-ZSTD, 3-BSLZ4
+  #unsigned int ElementSize;         // pixel size in bytes
+  #unsigned long long DataSize;      // uncompressed pixel data size
+  #unsigned int ChunkSize;          // uncompressed size of each chunk
+  #unsigned int NbChunks;
+#} DataArrayCompressionHeaderStruct;
+#unsigned int ChunkCompressedSize[NbChunks];
+#
+# The last chunk may be smaller than ChunkSize. The chunks are compressed
+# in parallel on a thread pool, each one is an independent LZ4 block
+# (without size prefix), zstd frame or bitshuffle-LZ4 block.
+#
+
+import struct
+import threading
+from multiprocessing.pool import ThreadPool
+
+import numpy
+
+try:
+    import lz4.block
+except ImportError:
+    lz4 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import bitshuffle
+except ImportError:
+    bitshuffle = None
+
+CompressionMagic = struct.unpack('>I', b'DTAC')[0]	# 0x44544143
+CompressionVersion = 1
+CompressionPackStr = '<IHHIIQII'
+CompressionHeaderLen = struct.calcsize(CompressionPackStr)
+
+DefaultChunkSize = 1024 * 1024
+
+Codec2Id = {'LZ4' : 1,
+            'ZSTD' : 2,
+            'BSLZ4' : 3}
+
+_zstd_local = threading.local()
+
+def _compress_lz4(chunk, elem_size) :
+    return lz4.block.compress(chunk, store_size=False)
+
+def _compress_zstd(chunk, elem_size) :
+    # ZstdCompressor objects can not be shared between threads
+    compressor = getattr(_zstd_local, 'compressor', None)
+    if compressor is None:
+        compressor = zstandard.ZstdCompressor(level=1)
+        _zstd_local.compressor = compressor
+    return compressor.compress(chunk)
+
+def _compress_bslz4(chunk, elem_size) :
+    dtype = numpy.dtype('u%d' % elem_size)
+    return bitshuffle.compress_lz4(numpy.frombuffer(chunk, dtype)).tobytes()
+
+def get_available_codecs() :
+    codecs = {}
+    if lz4 is not None:
+        codecs['LZ4'] = _compress_lz4
+    if zstandard is not None:
+        codecs['ZSTD'] = _compress_zstd
+    if bitshuffle is not None:
+        codecs['BSLZ4'] = _compress_bslz4
+    return codecs
+
+## @brief compress DATA_ARRAY buffers on a pool of threads
+class DataArrayCompressor:
+    def __init__(self, nb_thread=2, chunk_size=DefaultChunkSize) :
+        self.__nb_thread = max(1, nb_thread)
+        self.__chunk_size = chunk_size
+        self.__pool = None
+        self.__lock = threading.Lock()
+        self.__codecs = get_available_codecs()
+
+    def codecs(self) :
+        return list(self.__codecs.keys())
+
+    def __get_pool(self) :
+        with self.__lock:
+            if self.__pool is None:
+                self.__pool = ThreadPool(self.__nb_thread)
+            return self.__pool
+
+    def close(self) :
+        with self.__lock:
+            if self.__pool is not None:
+                self.__pool.close()
+                self.__pool = None
+
+    ## @brief compress a DATA_ARRAY
+    #
+    #@params codec one of the available codecs (see codecs())
+    #@params data_array the plain DATA_ARRAY buffer
+    #@params header_len the length of the DATA_ARRAY header
+    #@params elem_size the pixel size in bytes
+    #@return the DevEncoded format and the compressed DATA_ARRAY
+    def compress(self, codec, data_array, header_len, elem_size) :
+        compress_func = self.__codecs[codec]
+        view = memoryview(data_array)
+        data_size = len(data_array) - header_len
+        # bitshuffle works on whole elements
+        chunk_size = max(elem_size,
+                         self.__chunk_size - self.__chunk_size % elem_size)
+        chunks = [view[offset:offset + chunk_size]
+                  for offset in range(header_len, len(data_array), chunk_size)]
+
+        if len(chunks) > 1:
+            pool = self.__get_pool()
+            compressed = pool.map(lambda c: compress_func(c, elem_size), chunks)
+        else:
+            compressed = [compress_func(c, elem_size) for c in chunks]
+
+        nb_chunks = len(compressed)
+        sizes = struct.pack('<%dI' % nb_chunks, *[len(c) for c in compressed])
+        total = header_len + CompressionHeaderLen + len(sizes) + \
+                sum([len(c) for c in compressed])
+        out = bytearray(total)
+        out[:header_len] = view[:header_len]
+        struct.pack_into(CompressionPackStr, out, header_len,
+                         CompressionMagic,
+                         CompressionVersion,
+                         CompressionHeaderLen,
+                         Codec2Id[codec],
+                         elem_size,
+                         data_size,
+                         chunk_size,
+                         nb_chunks)
+        offset = header_len + CompressionHeaderLen
+        out[offset:offset + len(sizes)] = sizes
+        offset += len(sizes)
+        for c in compressed:
+            out[offset:offset + len(c)] = c
+            offset += len(c)
+        return 'DATA_ARRAY_' + codec, out
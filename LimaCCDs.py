@@ -47,12 +47,15 @@
 import sys,os,glob
 import PyTango
 import weakref
+import threading
 import itertools
 import numpy
 import struct
 import time
 import re
+import json
 import six
+import collections
 
 # Before loading Lima.Core, must find out the version the plug-in
 # was compiled with - horrible hack ...
@@ -66,6 +69,13 @@ from .EnvHelper import get_lima_camera_type, get_lima_device_name
 from .EnvHelper import create_tango_objects
 from .EnvHelper import get_camera_module, get_plugin_module
 from .AttrHelper import get_attr_4u
+from .CompressionHelper import DataArrayCompressor
+from .ShmHelper import SharedMemoryExporter
+from .PreviewHelper import PreviewEncoder
+from .StatHelper import FrameLatencyRecorder
+from .ProfileHelper import profiler, profiled, instrument_device_class
+from .ProfileHelper import instrument_callback_class, instrument_task_classes
+from .ProfileHelper import get_call_statistics, reset_call_statistics
 from Lima.Server.AttrHelper import getDictKey, getDictValue
 from Lima import Core
 
@@ -79,6 +89,26 @@ from Lima.Server import EdfFile
 TacoSpecificDict = {}
 TacoSpecificName = []
 
+# the processlib task base classes of the plugin tasks
+ProcesslibTaskClasses = tuple([getattr(Core.Processlib, name)
+                               for name in ('SinkTaskBase', 'LinkTaskBase')
+                               if hasattr(Core.Processlib, name)])
+
+# attributes added by init_device, (name, writable)
+DynamicAttributes = [('shutter_close_time', True),
+                     ('shutter_manual_state', True),
+                     ('shutter_mode', True),
+                     ('shutter_open_time', True)]
+
+# attribute snapshot order, the roi is written after the binning,
+# flip and rotation it depends on
+SnapshotPrefixes = ('acq', 'acc', 'shutter', 'saving', 'image', 'video', 'buffer')
+SnapshotWriteLast = ('image_roi',)
+# server side settings and acquisition triggers, not part of the
+# detector configuration (name or name prefix)
+SnapshotExcluded = ('image_events_', 'image_preview', 'image_shm_export_',
+                    'image_compression', 'video_pipeline_mode', 'video_live')
+
 VerboseLevel2TypeFlags = {
     0: ['Fatal'],
     1: ['Error'],
@@ -223,6 +253,21 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         Core.Bpp32S : 6 ,
         }        
 
+    # DataArrayType from the numpy dtype, for computed arrays
+    # which do not have a Lima image type (e.g. reduced stacks)
+    DType2DataArrayType = {
+        'u1' : 0,
+        'u2' : 1,
+        'u4' : 2,
+        'u8' : 3,
+        'i1' : 4,
+        'i2' : 5,
+        'i4' : 6,
+        'i8' : 7,
+        'f4' : 8,
+        'f8' : 9,
+        }
+
     # The DATA_ARRAY definition
     #struct {
       #unsigned int Magic= 0x44544159;
@@ -236,6 +281,27 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
       #unsigned int DimStep[8]
     #} DataArrayHeaderStruct;
 
+    # The DATA_BUNDLE definition (readImageSeqCounters)
+    #struct {
+      #unsigned int Magic= 0x44544244;
+      #unsigned short Version;
+      #unsigned short HeaderLength;
+      #unsigned int DirectoryLength;
+    #} DataBundleHeaderStruct;
+    # followed by the JSON directory and the section blobs, each one
+    # starting on a DataBundleAlign boundary
+    DataBundleVersion = 1
+    DataBundlePackStr = '<IHHI'
+    DataBundleMagic = struct.unpack('>I', b'DTBD')[0]	# 0x44544244
+    DataBundleHeaderLen = struct.calcsize(DataBundlePackStr)
+    DataBundleAlign = 8
+
+    # binning factors of the video_last_image_<n> attributes
+    VideoPyramidLevels = (2, 4, 8)
+
+    # max nb of readImageSeqBegin cursors kept alive, oldest dropped first
+    MaxImageSeqCursors = 16
+
     DataArrayVersion = 2
     DataArrayPackStr = '<IHHIIHHHHHHHHIIIIIIII'
     DataArrayMagic = struct.unpack('>I', b'DTAY')[0]	# 0x44544159
@@ -247,10 +313,15 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         return klass
 
     # INIT events on video_last_image
+    #
+    # the MaxVideoFPS budget is checked before any conversion, the
+    # frames over budget are dropped at once. The accepted ones are
+    # packed once and shared by the events and the GOVERNED reads
     class VideoImageCallback(Core.CtVideo.ImageCallback):
-        def __init__(self, device):
+        def __init__(self, device, events=True):
             Core.CtVideo.ImageCallback.__init__(self)
             self.__device = weakref.ref(device)
+            self.__events = events
             self.__video_last_image_timestamp = 0
         
         def newImage(self, image):
@@ -259,19 +330,26 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
             dt = ts - self.__video_last_image_timestamp
             if device.MaxVideoFPS <= 0 or dt >= 1.0 / device.MaxVideoFPS:
                 self.__video_last_image_timestamp = ts
-                device.push_change_event("video_last_image_counter",
-                                         image.frameNumber())
-                device.push_change_event("video_last_image", "VIDEO_IMAGE",
-                                         _video_image_2_struct(image))          
+                data = device._set_governed_video_image(image)
+                if self.__events:
+                    device.push_change_event("video_last_image_counter",
+                                             image.frameNumber())
+                    device.push_change_event("video_last_image",
+                                             "VIDEO_IMAGE", data)
+                    if device.VideoPyramidEvent:
+                        device._push_video_pyramid()
 
     @DataArrayUser
     class ImageStatusCallback(Core.CtControl.ImageStatusCallback):
 
         DefaultMaxEventRate = 25
+        DefaultQueueSize = 64
 
-        def __init__(self, device, control, events=False):
+        def __init__(self, device, control, events=False,
+                     queue_size=DefaultQueueSize, latency_recorder=None):
             Core.CtControl.ImageStatusCallback.__init__(self)
             self.__events = events
+            self.__latency_recorder = latency_recorder
             self.__device = weakref.ref(device)
             self.__control = weakref.ref(control)
             self.__last_base_image_ready = None
@@ -283,50 +361,113 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
             self.__last_event_time = 0
             self.__image_events_max_rate = self.DefaultMaxEventRate
             self.__last_acq_status = None
+            self.__last_image_data = None
+            self.__shm_exporter = None
+            # dispatch statistics
+            self.__dropped = 0
+            self.__last_latency = 0.
+            self.__max_latency = 0.
+            # the image status are queued (time, counters) and the
+            # reads, encoding and pushes are done by the dispatch thread
+            self.__queue = collections.deque()
+            self.__queue_size = max(2, queue_size)
+            self.__queue_cond = threading.Condition()
+            self.__stopped = False
+            self.__thread = threading.Thread(target=self.__dispatch,
+                                             name='ImageStatusDispatch')
+            self.__thread.daemon = True
+            self.__thread.start()
 
         def imageStatusChanged(self, image_status):
-            tn = time.time()
-            te = self.__last_event_time + 1.0 / self.__image_events_max_rate
-
-            # if the TangoEvent property is not set, the counters/image
-            # are not pushed
-            # if the property is set, we only send if 
-            # WARNING : this needs to be reworked as this means
-            # that the last events before the acquisition finishes
-            # can be lost
-            if self.__events and tn < te:
-                last_base_image_ready = image_status.LastBaseImageReady
-                last_counter_ready = image_status.LastCounterReady
-                last_image_acquired = image_status.LastImageAcquired
-                last_image_ready = image_status.LastImageReady
-                last_image_saved = image_status.LastImageSaved
-
-                device = self.__device()
-                if self.__last_base_image_ready != last_base_image_ready:
-                    device.push_change_event("last_base_image_ready",
-                                             last_base_image_ready)
-                    self.__last_base_image_ready = last_base_image_ready
-                if self.__last_counter_ready != last_counter_ready:
-                    device.push_change_event("last_counter_ready",
-                                             last_counter_ready)
-                if self.__last_image_acquired != last_image_acquired:
-                    device.push_change_event("last_image_acquired",
-                                             last_image_acquired)
-                    self.__last_image_acquired = last_image_acquired
-                if self.__last_image_ready != last_image_ready:
-                    device.push_change_event("last_image_ready", last_image_ready)
-                    self.__last_image_ready = last_image_ready
-                    if (last_image_ready >= 0) and self.__image_events_push_data:
-                        control = self.__control()
-                        image = control.ReadImage(last_image_ready)
-                        category = self.DataArrayCategory.Image
-                        data = device._image_2_data_array(image, category)
-                        device.push_change_event("last_image", 'DATA_ARRAY', data)
-                if self.__last_image_saved != last_image_saved:
-                    device.push_change_event("last_image_saved",
-                                             last_image_saved)
-                    self.__last_image_saved = last_image_saved
-
+            item = (time.time(),
+                    (image_status.LastBaseImageReady,
+                     image_status.LastCounterReady,
+                     image_status.LastImageAcquired,
+                     image_status.LastImageReady,
+                     image_status.LastImageSaved))
+            self.__put(item)
+
+        ## @brief queue an item, coalescing the counters if the queue is full
+        #
+        # only a counter update followed by another one of the same
+        # acquisition is dropped, the resets (LastImageAcquired < 0)
+        # are always kept
+        def __put(self, item):
+            with self.__queue_cond:
+                self.__queue.append(item)
+                if len(self.__queue) > self.__queue_size:
+                    for i in range(len(self.__queue) - 1):
+                        if self.__queue[i][1][2] >= 0 and \
+                           self.__queue[i + 1][1][2] >= 0:
+                            del self.__queue[i]
+                            self.__dropped += 1
+                            break
+                self.__queue_cond.notify()
+
+        ## @brief wait for the queued items, all of them are returned
+        def __get_all(self, timeout):
+            with self.__queue_cond:
+                if not self.__queue and not self.__stopped:
+                    self.__queue_cond.wait(timeout)
+                items = list(self.__queue)
+                self.__queue.clear()
+                return items
+
+        def stop(self):
+            with self.__queue_cond:
+                self.__stopped = True
+                self.__queue_cond.notify()
+            self.__thread.join(1.0)
+
+        ## @brief the dispatch thread
+        #
+        # the counters are coalesced: the latest ones are pushed at most
+        # image_events_max_rate times per second, the pending ones being
+        # flushed at the end of the rate window. When the acquisition is
+        # back to Ready they are pushed at once, so the last frames are
+        # never lost.
+        def __dispatch(self):
+            pending = None
+            pending_time = None
+            while True:
+                timeout = None
+                if pending is not None:
+                    te = self.__last_event_time + 1.0 / self.__image_events_max_rate
+                    timeout = max(0., te - time.time())
+                items = self.__get_all(timeout)
+                if self.__stopped:
+                    break
+                try:
+                    status = None
+                    if items:
+                        status = self.__control().getStatus().AcquisitionStatus
+                        self.__push_status(status, items)
+                        self.__notify_shm_exporter(items)
+                        self.__record_latency(items)
+                        if self.__events:
+                            if pending_time is None:
+                                pending_time = items[0][0]
+                            pending = items[-1][1]
+
+                    if pending is None:
+                        continue
+                    tn = time.time()
+                    te = self.__last_event_time + 1.0 / self.__image_events_max_rate
+                    if tn >= te or status == Core.AcqReady:
+                        self.__push_counters(*pending)
+                        self.__last_event_time = time.time()
+                        latency = self.__last_event_time - pending_time
+                        self.__last_latency = latency
+                        self.__max_latency = max(self.__max_latency, latency)
+                        pending = None
+                        pending_time = None
+                except:
+                    import traceback
+                    traceback.print_exc()
+                    pending = None
+                    pending_time = None
+
+        def __push_status(self, status, items):
             # pushing the status if:
             # - it has changed since the last callback call
             # - the counters are < 0 (e.g : prepare acq)
@@ -338,16 +479,64 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
             #       is "AcqRead" after the prepare, and already back to
             #       "AcqReady" when the first and only frame comes in,
             #       so we never see the change of status.
-            status = self.__control().getStatus().AcquisitionStatus
-            if status != self.__last_acq_status or image_status.LastImageAcquired < 0:
-                if image_status.LastImageAcquired < 0:
+            reset = [c[2] < 0 for t, c in items]
+            if status != self.__last_acq_status or any(reset):
+                if reset[-1]:
                     self.__last_acq_status = None
                 else:
                     self.__last_acq_status = status
                 self.__device().push_change_event("acq_status",
                                                   _acqstate2string(status))
 
-            self.__last_event_time = time.time()
+        def __record_latency(self, items):
+            recorder = self.__latency_recorder
+            if recorder is None:
+                return
+            for t, c in items:
+                # acquired, base ready, ready, counter ready, saved
+                recorder.update(t, (c[2], c[0], c[3], c[1], c[4]))
+
+        def __notify_shm_exporter(self, items):
+            exporter = self.__shm_exporter
+            if exporter is None:
+                return
+            if any([c[3] < 0 for t, c in items]):
+                exporter.notify(-1)
+            exporter.notify(items[-1][1][3])
+
+        def __push_counters(self, last_base_image_ready, last_counter_ready,
+                            last_image_acquired, last_image_ready,
+                            last_image_saved):
+            device = self.__device()
+            if self.__last_base_image_ready != last_base_image_ready:
+                device.push_change_event("last_base_image_ready",
+                                         last_base_image_ready)
+                self.__last_base_image_ready = last_base_image_ready
+            if self.__last_counter_ready != last_counter_ready:
+                device.push_change_event("last_counter_ready",
+                                         last_counter_ready)
+                self.__last_counter_ready = last_counter_ready
+            if self.__last_image_acquired != last_image_acquired:
+                device.push_change_event("last_image_acquired",
+                                         last_image_acquired)
+                self.__last_image_acquired = last_image_acquired
+            if self.__last_image_ready != last_image_ready:
+                device.push_change_event("last_image_ready", last_image_ready)
+                self.__last_image_ready = last_image_ready
+                if (last_image_ready >= 0) and self.__image_events_push_data:
+                    control = self.__control()
+                    image = control.ReadImage(last_image_ready)
+                    category = self.DataArrayCategory.Image
+                    self.__last_image_data = device._image_2_data_array(
+                        image, category, self.__last_image_data)
+                    data_format, data = device._encode_data_array(
+                        self.__last_image_data)
+                    device.push_change_event("last_image", data_format,
+                                             data)
+            if self.__last_image_saved != last_image_saved:
+                device.push_change_event("last_image_saved",
+                                         last_image_saved)
+                self.__last_image_saved = last_image_saved
 
         def getImageEventsPushData(self):
             return self.__image_events_push_data
@@ -361,6 +550,19 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         def setImageEventsMaxRate(self, max_rate):
             self.__image_events_max_rate = max_rate
 
+        def getQueueDepth(self):
+            with self.__queue_cond:
+                return len(self.__queue)
+
+        def getDroppedCount(self):
+            return self.__dropped
+
+        def getDispatchLatency(self):
+            return self.__last_latency, self.__max_latency
+
+        def setShmExporter(self, exporter):
+            self.__shm_exporter = exporter
+
 #------------------------------------------------------------------
 #    Device constructor
 #------------------------------------------------------------------
@@ -375,12 +577,30 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         self.__image_number_header_delimiter = ';'
         self.__readImage_frame_number = 0
         self.__configInit = False
+
+        # DATA_ARRAY buffers, reused from one call to the next
+        # and also kept alive as workaround for PyTango #147
+        self._lidata = None
+        self._lidataencoded = None
+        self._datacache = None
+        self._dataseqcache = None
+        self._dataseqchunkcache = None
+        self._basedatacache = None
+        self._databundlecache = None
+
+        # readImageSeqBegin/Next cursors: id -> [frames, next index, chunk]
+        self.__image_seq_cursors = collections.OrderedDict()
+        self.__image_seq_cursor_id = itertools.count(1)
        
 #------------------------------------------------------------------
 #    Device destructor
 #------------------------------------------------------------------
     @Core.DEB_MEMBER_FUNCT
     def delete_device(self) :
+        self.__image_status_cbk.stop()
+        self._stop_shm_export()
+        self.__compressor.close()
+        self.__preview_encoder.close()
         try:
             m = get_camera_module(self.LimaCameraType)
         except ImportError:
@@ -403,6 +623,9 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         TacoSpecificName.append(self.LimaCameraType)
 
         self.__control = _get_control()
+        self._invalidate_data_array_headers()
+        self.__status_snapshot = None
+        self.__status_snapshot_time = 0
 
         # For performance settings Pool thread (default 2) and Writing tasks (default 1)
         nb_thread = int(self.NbProcessingThread)
@@ -564,6 +787,24 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
             self.__VideoMode['YUV444PACKED'] = Core.YUV444PACKED
 
         
+        #DATA_ARRAY compression
+        self.__compressor = DataArrayCompressor(int(self.NbCompressionThread))
+        self.__ImageCompression = {'NONE' : None}
+        for codec in self.__compressor.codecs():
+            self.__ImageCompression[codec] = codec
+        self.__image_compression = 'NONE'
+
+        #Image preview
+        self.__preview_encoder = PreviewEncoder(int(self.NbPreviewThread))
+        self.__ImagePreviewFormat = dict([(x, x) for x in self.__preview_encoder.formats()])
+        self.__ImagePreviewScaling = {'MINMAX' : 'MINMAX',
+                                      'PERCENTILE' : 'PERCENTILE'}
+        # the first format available, none without PIL or PyTurboJPEG
+        formats = self.__preview_encoder.formats()
+        self.__image_preview_format = formats[0] if formats else ''
+        self.__image_preview_scaling = 'MINMAX'
+        self.__image_preview_quality = 80
+
         self.__VideoSource = {}
         if SystemHasFeature('Core.CtVideo.BASE_IMAGE'):
             self.__VideoSource = {'BASE_IMAGE': Core.CtVideo.BASE_IMAGE,
@@ -582,20 +823,38 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
                           "last_counter_ready", "last_image_acquired",
                           "last_image_ready", "last_image_saved",
                           "video_last_image", "video_last_image_counter",
+                          "video_last_image_2", "video_last_image_4",
+                          "video_last_image_8",
                           "acq_status"]:
             attr = attr_list.get_attr_by_name(attr_name)
             attr.set_change_event(True, False)
         
+        # INIT video pipeline
+        self.__VideoPipelineMode = {'DIRECT' : 'DIRECT',
+                                    'GOVERNED' : 'GOVERNED'}
+        self.__video_pipeline_mode = 'DIRECT'
+        self.__video_image_cache = None
+        self.__governed_video_image = None
+        # one pyramid per video image source, DIRECT and GOVERNED
+        self.__video_pyramids = {}
+        self.__video_image_cbk = None
         if self.TangoEvent:
-            self.__video_image_cbk = self.VideoImageCallback(self)
-            self.__control.video().registerImageCallback(self.__video_image_cbk)
+            self._register_video_image_callback()
 
         # INIT events on last_image_ready
-        self.__image_status_cbk = self.ImageStatusCallback(self,
-                                                           self.__control,
-                                                           events=self.TangoEvent)
+        self.__latency_recorder = FrameLatencyRecorder(
+            int(self.FrameLatencyRingSize))
+        self.__image_status_cbk = self.ImageStatusCallback(
+            self, self.__control, events=self.TangoEvent,
+            queue_size=int(self.ImageEventsQueueSize),
+            latency_recorder=self.__latency_recorder)
         self.__control.registerImageStatusCallback(self.__image_status_cbk)
 
+        # INIT shared memory export of the images
+        self.__shm_exporter = None
+        self.__shm_export_name = self.ImageShmExportName or \
+            'lima_%s' % re.sub('[^0-9A-Za-z_.-]', '_', self.get_name())
+
         # Setup a user-defined detector name if it exists
         if self.UserInstrumentName:
             if SystemHasFeature('Core.HwDetInfoCtrlObj.setInstrumentName'):
@@ -622,6 +881,10 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
             is_not = (SystemHasFeature(feature) and 'is') or 'is not'
             deb.Trace('Feature %s %s present' % (feature, is_not))
 
+        # INIT generic attribute methods
+        self.__build_dispatch_table()
+        self.__snapshot_attributes = self.__get_snapshot_attributes()
+
         # Add shutter capability related attributes if supported
         if self.__control.shutter().hasCapability():
             self.add_attribute(
@@ -640,31 +903,121 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
 
     def __getattr__(self,name) :
         if name.startswith('is_') and name.endswith('_allowed') :
-            split_name = name.split('_')[1:-1]
-            attr_name = ''.join([x.title() for x in split_name])
-            dict_name = '_' + self.__class__.__name__ + '__' + attr_name
-            d = getattr(self,dict_name,None)
-            func = _allowed
-            if d is not None:
-                if not d:
-                    func = _not_allowed
+            func = self.__get_is_allowed(name[3:-8])
+        else :
+            func = self.__get_generic_accessor(name)
+        if func is not None:
             self.__dict__[name] = func
             return func
-        else :
-             split_name = name.split('_')[1:]
-             subClass = self.__Name2SubClass.get("_".join(split_name),None)
-             if subClass is None:
-                 subClass = self.__Prefix2SubClass.get(split_name[0],None)
-             if subClass:
-                 obj = subClass()
-                 return get_attr_4u(self,name, obj)
         
         raise AttributeError('LimaCCDs has no attribute %s' % name)
 
+    ## @brief is_<attr>_allowed of an attribute without explicit method
+    #
+    # not allowed if its enum dictionnary is empty (feature not supported)
+    def __get_is_allowed(self,attr_name) :
+        dict_name = '_LimaCCDs__' + ''.join([x.title() for x in attr_name.split('_')])
+        d = getattr(self,dict_name,None)
+        if d is not None and not d:
+            return _not_allowed
+        return _allowed
+
+    ## @brief read_/write_ method mapped on a Ct sub-object
+    #
+    #@return None if the name is not mapped
+    def __get_generic_accessor(self,name) :
+        if not (name.startswith('read_') or name.startswith('write_')) :
+            return None
+        split_name = name.split('_')[1:]
+        subClass = self.__Name2SubClass.get("_".join(split_name),None)
+        if subClass is None:
+            subClass = self.__Prefix2SubClass.get(split_name[0],None)
+        if not subClass:
+            return None
+        func = get_attr_4u(self,name,subClass(),update_dict=False)
+        return profiled(func, 'LimaCCDs.' + name)
+
+    ## @brief resolve once the generic attribute methods
+    #
+    # the is_<attr>_allowed, read_<attr> and write_<attr> methods not
+    # defined by the class are stored in the instance dictionnary, so
+    # the Tango requests neither go through __getattr__ nor parse names
+    def __build_dispatch_table(self) :
+        klass = self.__class__
+        attributes = [(name, config[0][2] != PyTango.READ)
+                      for name, config in LimaCCDsClass.attr_list.items()]
+        attributes.extend(DynamicAttributes)
+        for attr_name, writable in attributes:
+            name = 'is_%s_allowed' % attr_name
+            if not hasattr(klass, name):
+                self.__dict__[name] = self.__get_is_allowed(attr_name)
+            for name in ['read_' + attr_name, 'write_' + attr_name][:1 + writable]:
+                if hasattr(klass, name):
+                    continue
+                try:
+                    func = self.__get_generic_accessor(name)
+                except AttributeError:
+                    # not in this Lima version, __getattr__ will raise
+                    func = None
+                if func is not None:
+                    self.__dict__[name] = func
+                else:
+                    self.__dict__.pop(name, None)
+
+    ## @brief attributes of the snapshot, in write order
+    #
+    #@return a list of (name, writable)
+    def __get_snapshot_attributes(self) :
+        attributes = [(name, config[0][2] != PyTango.READ)
+                      for name, config in LimaCCDsClass.attr_list.items()
+                      if config[0][0] != PyTango.DevEncoded and
+                      config[0][1] != PyTango.IMAGE]
+        if self.__control.shutter().hasCapability():
+            attributes.extend(DynamicAttributes)
+        attributes = [(name, writable) for name, writable in attributes
+                      if name.split('_')[0] in self.__Prefix2SubClass and
+                      name.split('_')[0] in SnapshotPrefixes and
+                      not name.startswith(SnapshotExcluded)]
+        return sorted(attributes,
+                      key=lambda a: (SnapshotPrefixes.index(a[0].split('_')[0]),
+                                     a[0] in SnapshotWriteLast, a[0]))
+
     def gc(self):
         import gc
         gc.collect()
 
+    ## @brief start profiling the Tango requests
+    #
+    # the attribute and command calls of LimaCCDs and of the plugins are
+    # profiled with cProfile until profilerStop
+    @Core.DEB_MEMBER_FUNCT
+    def profilerStart(self):
+        profiler.start()
+
+    ## @brief stop profiling the Tango requests
+    #
+    #@return the statistics sorted by cumulative time
+    @Core.DEB_MEMBER_FUNCT
+    def profilerStop(self):
+        return profiler.stop()
+
+    ## @brief get the call statistics of the attributes and commands
+    #
+    #@return [[nb calls, total time, max time] per method],[method names]
+    # only the methods called since the last reset are returned
+    @Core.DEB_MEMBER_FUNCT
+    def getCallStatistics(self):
+        names = []
+        values = []
+        for name, (nb, total, max_time) in get_call_statistics():
+            names.append(name)
+            values.extend((nb, total, max_time))
+        return values, names
+
+    @Core.DEB_MEMBER_FUNCT
+    def resetCallStatistics(self):
+        reset_call_statistics()
+
     @Core.DEB_MEMBER_FUNCT
     def apply_config(self) :
         '''
@@ -693,6 +1046,28 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
                     except Core.Exception:
                         pass
 
+    ##@brief called once per read_attributes request
+    #
+    # drop the status snapshot so that all the attributes read by
+    # one request share one CtControl.getStatus() call.
+    # With the StatusCacheTime property (in us) the snapshot can
+    # also be shared by successive requests
+    def read_attr_hardware(self,data) :
+        if self.__status_snapshot is not None:
+            age = time.time() - self.__status_snapshot_time
+            if age * 1e6 >= self.StatusCacheTime:
+                self.__status_snapshot = None
+
+    ##@brief get the CtControl status snapshot of the current request
+    #
+    def _get_status(self) :
+        status = self.__status_snapshot
+        if status is None:
+            status = self.__control.getStatus()
+            self.__status_snapshot = status
+            self.__status_snapshot_time = time.time()
+        return status
+
 #==================================================================
 #
 #    LimaCCDs read/write attribute methods
@@ -769,14 +1144,14 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
     #
     @Core.DEB_MEMBER_FUNCT
     def read_acq_status(self,attr) :
-        status = self.__control.getStatus()
+        status = self._get_status()
         attr.set_value(_acqstate2string(status.AcquisitionStatus))
 
     ## @brief get the errir message when acq_status is in Fault stat
     #
     @Core.DEB_MEMBER_FUNCT
     def read_acq_status_fault_error(self,attr) :
-        status = self.__control.getStatus()
+        status = self._get_status()
         state2string = {Core.CtControl.NoError : "No error",
                         Core.CtControl.SaveUnknownError : "Saving: unknown error",
                         Core.CtControl.SaveOpenError : "Saving: file open error",
@@ -1004,6 +1379,7 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         image = self.__control.image()
         roi = Core.Roi(*data)
         image.setRoi(roi)
+        self._invalidate_data_array_headers()
 
     ## @brief Read image type
     #
@@ -1064,6 +1440,7 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         image = self.__control.image()
         binValue = Core.Bin(*data)
         image.setBin(binValue)
+        self._invalidate_data_array_headers()
 
     ## @brief Read image flip
     #
@@ -1132,19 +1509,20 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
     #
     @Core.DEB_MEMBER_FUNCT
     def read_last_image(self,attr) :
-        status = self.__control.getStatus()
+        status = self._get_status()
         last_img_ready = status.ImageCounters.LastImageReady
         image = self.__control.ReadImage(last_img_ready)
         # workaround for PyTango #147
         self._lidata = self._image_2_data_array(
-            image, self.DataArrayCategory.Image)
-        attr.set_value('DATA_ARRAY', self._lidata)
+            image, self.DataArrayCategory.Image, self._lidata)
+        self._lidataencoded = self._encode_data_array(self._lidata)
+        attr.set_value(*self._lidataencoded)
 
     ## @brief last image acquired
     #
     @Core.DEB_MEMBER_FUNCT
     def read_last_image_acquired(self,attr) :
-        status = self.__control.getStatus()
+        status = self._get_status()
         img_counters = status.ImageCounters
 
         value = img_counters.LastImageAcquired
@@ -1154,7 +1532,7 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
     #
     @Core.DEB_MEMBER_FUNCT
     def read_last_base_image_ready(self,attr) :
-        status = self.__control.getStatus()
+        status = self._get_status()
         img_counters = status.ImageCounters
 
         value = img_counters.LastBaseImageReady
@@ -1165,7 +1543,7 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
     #
     @Core.DEB_MEMBER_FUNCT
     def read_last_image_ready(self,attr) :
-        status = self.__control.getStatus()
+        status = self._get_status()
         img_counters= status.ImageCounters
 
         value = img_counters.LastImageReady
@@ -1176,7 +1554,7 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
     #
     @Core.DEB_MEMBER_FUNCT
     def read_last_counter_ready(self,attr) :
-        status = self.__control.getStatus()
+        status = self._get_status()
         img_counters= status.ImageCounters
 
         value = img_counters.LastCounterReady
@@ -1187,7 +1565,7 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
     #
     @Core.DEB_MEMBER_FUNCT
     def read_last_image_saved(self,attr) :
-        status = self.__control.getStatus()
+        status = self._get_status()
         img_counters= status.ImageCounters
 
         value = img_counters.LastImageSaved
@@ -1223,6 +1601,159 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         event_rate = attr.get_write_value()
         self.__image_status_cbk.setImageEventsMaxRate(event_rate)
 
+    ## @brief get the nb of image status waiting for the event dispatcher
+    #
+    @Core.DEB_MEMBER_FUNCT
+    def read_image_events_queue_depth(self,attr) :
+        attr.set_value(self.__image_status_cbk.getQueueDepth())
+
+    ## @brief get the nb of image status dropped because the queue was full
+    #
+    @Core.DEB_MEMBER_FUNCT
+    def read_image_events_dropped(self,attr) :
+        attr.set_value(self.__image_status_cbk.getDroppedCount())
+
+    ## @brief get the last and max delay between an image status and its push
+    #
+    @Core.DEB_MEMBER_FUNCT
+    def read_image_events_latency(self,attr) :
+        attr.set_value(self.__image_status_cbk.getDispatchLatency(),2)
+
+    ## @brief get a JPEG or PNG preview of the last image ready
+    #
+    # the preview is scaled to 8 bits grey and encoded once per frame
+    # whatever the number of readers
+    @Core.DEB_MEMBER_FUNCT
+    def read_image_preview(self,attr) :
+        fmt = self.__image_preview_format
+        if fmt not in self.__ImagePreviewFormat:
+            PyTango.Except.throw_exception('WrongData',\
+                                           'No preview format available (needs pillow or PyTurboJPEG)',\
+                                           'LimaCCD Class')
+        frame_number = self._get_status().ImageCounters.LastImageReady
+        if frame_number < 0:
+            attr.set_value(fmt, b'')
+            return
+        data = self.__preview_encoder.encode(frame_number,
+                                             self._read_preview_image,
+                                             fmt,
+                                             self.__image_preview_scaling,
+                                             self.__image_preview_quality)
+        attr.set_value(fmt, data)
+
+    def _read_preview_image(self, frame_number):
+        image = self.__control.ReadImage(frame_number)
+        return image.buffer, lambda: _release_data(image)
+
+    def read_image_preview_format(self,attr) :
+        attr.set_value(self.__image_preview_format)
+
+    def write_image_preview_format(self,attr) :
+        data = attr.get_write_value()
+        value = data.upper()
+        if value not in self.__ImagePreviewFormat:
+            PyTango.Except.throw_exception('WrongData',\
+                                           'Wrong value %s: %s'%('image_preview_format', value),\
+                                           'LimaCCD Class')
+        else:
+            self.__image_preview_format = value
+
+    def read_image_preview_scaling(self,attr) :
+        attr.set_value(self.__image_preview_scaling)
+
+    def write_image_preview_scaling(self,attr) :
+        data = attr.get_write_value()
+        value = data.upper()
+        if value not in self.__ImagePreviewScaling:
+            PyTango.Except.throw_exception('WrongData',\
+                                           'Wrong value %s: %s'%('image_preview_scaling', value),\
+                                           'LimaCCD Class')
+        else:
+            self.__image_preview_scaling = value
+
+    def read_image_preview_quality(self,attr) :
+        attr.set_value(self.__image_preview_quality)
+
+    def write_image_preview_quality(self,attr) :
+        data = attr.get_write_value()
+        if not 1 <= data <= 100:
+            PyTango.Except.throw_exception('WrongData',\
+                                           'Wrong value %s: %s'%('image_preview_quality', data),\
+                                           'LimaCCD Class')
+        else:
+            self.__image_preview_quality = data
+
+    ## @brief is the shared memory export of the images running
+    #
+    @Core.DEB_MEMBER_FUNCT
+    def read_image_shm_export_active(self,attr) :
+        attr.set_value(self.__shm_exporter is not None)
+
+    ## @brief start/stop the shared memory export of the images
+    #
+    # the images ready are copied in a ring buffer (see ShmHelper)
+    # described by the image_shm_export_descriptor attribute
+    @Core.DEB_MEMBER_FUNCT
+    def write_image_shm_export_active(self,attr) :
+        active = attr.get_write_value()
+        if active and self.__shm_exporter is None:
+            self.__shm_exporter = SharedMemoryExporter(
+                self.__shm_export_name, int(self.ImageShmExportNbSlots),
+                self._export_shm_frame, self.ImageShmExportDirectory or None)
+            self.__image_status_cbk.setShmExporter(self.__shm_exporter)
+        elif not active:
+            self._stop_shm_export()
+
+    ## @brief get the shared memory export description as a JSON string
+    #
+    # name, path, slot_size, nb_slots and write_index of the segment
+    @Core.DEB_MEMBER_FUNCT
+    def read_image_shm_export_descriptor(self,attr) :
+        exporter = self.__shm_exporter
+        if exporter is None:
+            attr.set_value('{}')
+        else:
+            attr.set_value(json.dumps(exporter.descriptor()))
+
+    def _stop_shm_export(self):
+        exporter = self.__shm_exporter
+        if exporter is not None:
+            self.__image_status_cbk.setShmExporter(None)
+            self.__shm_exporter = None
+            exporter.stop()
+
+    ## @brief read a frame and give it to the shared memory writer
+    #
+    # called by the exporter thread
+    def _export_shm_frame(self, frame_number, write):
+        image = self.__control.ReadImage(frame_number)
+        try:
+            data = image.buffer
+            header = self._get_data_array_header(data.shape, data.dtype,
+                                                 self.DataArrayCategory.Image)
+            write(header, data)
+        finally:
+            _release_data(image)
+
+    ## @brief get the compression of the DATA_ARRAY image transfers
+    #
+    @Core.DEB_MEMBER_FUNCT
+    def read_image_compression(self,attr) :
+        attr.set_value(self.__image_compression)
+
+    ## @brief set the compression of the DATA_ARRAY image transfers
+    #
+    @Core.DEB_MEMBER_FUNCT
+    def write_image_compression(self,attr) :
+        data = attr.get_write_value()
+        value = data.upper()
+        if value not in self.__ImageCompression:
+            PyTango.Except.throw_exception('WrongData',\
+                                           'Wrong value %s: %s'%('image_compression', value),\
+                                           'LimaCCD Class')
+        else:
+            self.__image_compression = value
+
     ## @brief this flag is true just after
     #  the detector readout.
     #
@@ -1239,7 +1770,7 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
     #
     @Core.DEB_MEMBER_FUNCT
     def read_ready_for_next_acq(self,attr) :
-        status = self.__control.getStatus()
+        status = self._get_status()
         attr.set_value(status.AcquisitionStatus == Core.AcqReady)
 
     
@@ -1251,6 +1782,47 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         saving = self.__control.saving()
         attr.set_value(saving.getStatisticCounters(),4)
 	
+    ## @brief latency statistics of the frame pipeline
+    #
+    # p50, p99 and max in second of the time between the acquisition of
+    # a frame and each of the following stages, from the image status
+    # callbacks of the last FrameLatencyRingSize frames
+    @Core.DEB_MEMBER_FUNCT
+    def read_latency_frame_period(self,attr) :
+        attr.set_value(self.__latency_recorder.stage_stats('acquired'),3)
+
+    @Core.DEB_MEMBER_FUNCT
+    def read_latency_base_image_ready(self,attr) :
+        attr.set_value(self.__latency_recorder.stage_stats('base_ready'),3)
+
+    @Core.DEB_MEMBER_FUNCT
+    def read_latency_image_ready(self,attr) :
+        attr.set_value(self.__latency_recorder.stage_stats('ready'),3)
+
+    @Core.DEB_MEMBER_FUNCT
+    def read_latency_counter_ready(self,attr) :
+        attr.set_value(self.__latency_recorder.stage_stats('counter_ready'),3)
+
+    @Core.DEB_MEMBER_FUNCT
+    def read_latency_image_saved(self,attr) :
+        attr.set_value(self.__latency_recorder.stage_stats('saved'),3)
+
+    ## @brief get the frame timestamps of the latency ring
+    #
+    #@return one row per frame: frame number and the time it was acquired,
+    # base ready, ready, counter ready and saved (NaN if not reached)
+    @Core.DEB_MEMBER_FUNCT
+    def getFrameLatency(self):
+        frames, times = self.__latency_recorder.dump()
+        rows = numpy.empty((len(frames), times.shape[1] + 1), dtype=numpy.double)
+        rows[:, 0] = frames
+        rows[:, 1:] = times
+        return rows.ravel()
+
+    @Core.DEB_MEMBER_FUNCT
+    def resetFrameLatency(self):
+        self.__latency_recorder.reset()
+
     ## @brief get the write statistics history size
     #
     @Core.DEB_MEMBER_FUNCT
@@ -1605,10 +2177,138 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         roi = Core.Roi(*data)
         video.setRoi(roi)
 
+    ## @brief get the last video image
+    #
+    # DIRECT mode: the last Lima video image, packed only once per new
+    # video image whatever the number of readers.
+    # GOVERNED mode: the last image accepted by the MaxVideoFPS budget,
+    # as pushed by the events, never packed on read.
     def read_video_last_image(self,attr) :
+        cache = self._get_video_image_cache()
+        if cache is None:
+            attr.set_value("VIDEO_IMAGE", b'')
+        else:
+            attr.set_value("VIDEO_IMAGE", cache[1])
+
+    ## @brief get the (key, packed VIDEO_IMAGE) served to the readers
+    #
+    # in DIRECT mode the image already packed by the video image
+    # callback for the events is reused
+    def _get_video_image_cache(self):
+        if self.__video_pipeline_mode == 'GOVERNED':
+            return self.__governed_video_image
         video = self.__control.video()
-        self._videoStr = _video_image_2_struct(video.getLastImage())
-        attr.set_value("VIDEO_IMAGE", self._videoStr)
+        counter = video.getLastImageCounter()
+        cache = self.__video_image_cache
+        if cache is None or cache[0] != counter:
+            image = video.getLastImage()
+            governed = self.__governed_video_image
+            if governed is not None and governed[0] == image.frameNumber():
+                data = governed[1]
+            else:
+                data = _video_image_2_struct(image)
+            cache = (counter, data)
+            self.__video_image_cache = cache
+        return cache
+
+    ## @brief forget the packed video images of the previous acquisition
+    #
+    # the frame numbers start again from 0
+    def _invalidate_video_images(self):
+        self.__video_image_cache = None
+        self.__governed_video_image = None
+
+    ## @brief get the binned levels of a video image
+    #
+    # the levels are computed once per video image, on the first read
+    # or event push which needs them
+    #@return a dict {binning factor : packed VIDEO_IMAGE}
+    #@params source the video_pipeline_mode the image comes from
+    def _get_video_pyramid(self, cache, source):
+        pyramid = self.__video_pyramids.get(source)
+        if pyramid is None or pyramid[0] is not cache:
+            pyramid = (cache, _video_struct_2_pyramid(cache[1],
+                                                      self.VideoPyramidLevels))
+            self.__video_pyramids[source] = pyramid
+        return pyramid[1]
+
+    def _read_video_pyramid_level(self, attr, factor):
+        cache = self._get_video_image_cache()
+        if cache is None:
+            attr.set_value("VIDEO_IMAGE", b'')
+            return
+        levels = self._get_video_pyramid(cache, self.__video_pipeline_mode)
+        if levels is None:
+            PyTango.Except.throw_exception('WrongData',\
+                                           'Video pyramid only available for Y8, Y16, Y32 and Y64 video modes',\
+                                           'LimaCCD Class')
+        attr.set_value("VIDEO_IMAGE", levels.get(factor, b''))
+
+    def read_video_last_image_2(self,attr) :
+        self._read_video_pyramid_level(attr, 2)
+
+    def read_video_last_image_4(self,attr) :
+        self._read_video_pyramid_level(attr, 4)
+
+    def read_video_last_image_8(self,attr) :
+        self._read_video_pyramid_level(attr, 8)
+
+    ## @brief push the binned levels of the last governed video image
+    #
+    # called by VideoImageCallback with the VideoPyramidEvent property,
+    # color modes are not pushed
+    def _push_video_pyramid(self):
+        cache = self.__governed_video_image
+        levels = self._get_video_pyramid(cache, 'GOVERNED')
+        if levels is None:
+            return
+        for factor, data in sorted(levels.items()):
+            self.push_change_event("video_last_image_%d" % factor,
+                                   "VIDEO_IMAGE", data)
+
+    ## @brief pack and keep an image accepted by the video governor
+    #
+    # called by VideoImageCallback
+    def _set_governed_video_image(self, image):
+        data = _video_image_2_struct(image)
+        self.__governed_video_image = (image.frameNumber(), data)
+        return data
+
+    def _register_video_image_callback(self):
+        if self.__video_image_cbk is None:
+            self.__video_image_cbk = self.VideoImageCallback(
+                self, events=self.TangoEvent)
+            self.__control.video().registerImageCallback(
+                self.__video_image_cbk)
+
+    def _unregister_video_image_callback(self):
+        if self.__video_image_cbk is not None:
+            self.__control.video().unregisterImageCallback(
+                self.__video_image_cbk)
+            self.__video_image_cbk = None
+
+    def read_video_pipeline_mode(self,attr) :
+        attr.set_value(self.__video_pipeline_mode)
+
+    ## @brief select how video_last_image is served
+    #
+    # GOVERNED needs the video image callback, it is registered
+    # even if TangoEvent is not set and unregistered when leaving
+    # GOVERNED without TangoEvent
+    def write_video_pipeline_mode(self,attr) :
+        data = attr.get_write_value()
+        value = data.upper()
+        if value not in self.__VideoPipelineMode:
+            PyTango.Except.throw_exception('WrongData',\
+                                           'Wrong value %s: %s'%('video_pipeline_mode', value),\
+                                           'LimaCCD Class')
+        else:
+            if value == 'GOVERNED':
+                self._register_video_image_callback()
+            self.__video_pipeline_mode = value
+            if value != 'GOVERNED' and not self.TangoEvent:
+                self._unregister_video_image_callback()
+                self.__governed_video_image = None
 
     def read_video_last_image_counter(self,attr) :
         video = self.__control.video()
@@ -1702,16 +2402,110 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
 
         return valueList
 
+#==================================================================
+#------------------------------------------------------------------
+#    getAttributeSnapshot command:
+#
+#    Description: read the acq, acc, shutter, saving, image, video and
+#    buffer attributes in one call
+#    argout: DevString   JSON object {attribute name : value}
+#------------------------------------------------------------------
+    @Core.DEB_MEMBER_FUNCT
+    def getAttributeSnapshot(self) :
+        # read_attr_hardware is not called for a command
+        self.__status_snapshot = None
+        snapshot = collections.OrderedDict()
+        for name, writable in self.__snapshot_attributes:
+            if not getattr(self, 'is_%s_allowed' % name)(PyTango.AttReqType.READ_REQ):
+                continue
+            attr = _AttrValue()
+            try:
+                getattr(self, 'read_' + name)(attr)
+            except (PyTango.DevFailed, Core.Exception, AttributeError, RuntimeError) as e:
+                deb.Warning('Snapshot can not read %s: %s' % (name, e))
+                continue
+            snapshot[name] = attr.value
+        return json.dumps(snapshot, default=_json_default)
+
+#==================================================================
+#------------------------------------------------------------------
+#    setAttributeSnapshot command:
+#
+#    Description: write a set of attributes, in the snapshot order.
+#    If a write fails the attributes already written are restored,
+#    as far as possible: the ones which can not be written back are
+#    listed in the raised error.
+#    argin: DevString   JSON object {attribute name : value}
+#------------------------------------------------------------------
+    @Core.DEB_MEMBER_FUNCT
+    def setAttributeSnapshot(self, snapshot) :
+        try:
+            values = json.loads(snapshot)
+        except ValueError:
+            values = None
+        if not isinstance(values, dict):
+            PyTango.Except.throw_exception('WrongData',
+                                           'Wrong value snapshot: not a JSON object',
+                                           'LimaCCD Class')
+        writable = dict(self.__snapshot_attributes)
+        for name in values:
+            if not writable.get(name):
+                PyTango.Except.throw_exception('WrongData',
+                                               'Wrong value snapshot: %s is not a writable attribute' % name,
+                                               'LimaCCD Class')
+            if not getattr(self, 'is_%s_allowed' % name)(PyTango.AttReqType.WRITE_REQ):
+                PyTango.Except.throw_exception('WrongData',
+                                               'Wrong value snapshot: %s can not be written' % name,
+                                               'LimaCCD Class')
+        written = []
+        try:
+            for name, w in self.__snapshot_attributes:
+                if name not in values:
+                    continue
+                attr = _AttrValue()
+                getattr(self, 'read_' + name)(attr)
+                getattr(self, 'write_' + name)(_AttrValue(values[name]))
+                written.append((name, attr.value))
+        except:
+            exc_info = sys.exc_info()
+            not_restored = []
+            for name, value in reversed(written):
+                try:
+                    getattr(self, 'write_' + name)(_AttrValue(value))
+                except:
+                    deb.Error('Snapshot can not restore %s' % name)
+                    not_restored.append(name)
+            if not_restored:
+                PyTango.Except.throw_exception('WrongData',
+                                               'Snapshot write failed (%s), not restored: %s' %
+                                               (exc_info[1], ', '.join(not_restored)),
+                                               'LimaCCD Class')
+            six.reraise(*exc_info)
+
     ##@brief prepare an acquisition
     #
     @Core.DEB_MEMBER_FUNCT
     def prepareAcq(self) :
+        self._invalidate_data_array_headers()
+        # the sequence cursors can not continue in a new acquisition
+        self.__image_seq_cursors.clear()
+        status = self.__control.getStatus()
+        last_frame = status.ImageCounters.LastCounterReady
+        self.__preview_encoder.invalidate()
+        self._invalidate_video_images()
         self.__control.prepareAcq()
+        # after the prepare, the previous results are cleared
+        for name, dev in self._get_plugin_devices():
+            if hasattr(dev, 'acq_prepared'):
+                dev.acq_prepared(last_frame)
         self._push_status()
 
     ##@brief pushing the acquisition status
     def _push_status(self):
         status = self.__control.getStatus()
+        # the acquisition state has changed, refresh the snapshot
+        self.__status_snapshot = status
+        self.__status_snapshot_time = time.time()
         self.push_change_event(
             'acq_status',
             _acqstate2string(status.AcquisitionStatus))
@@ -1742,6 +2536,7 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
     @Core.DEB_MEMBER_FUNCT
     def reset(self) :
         self.__control.reset()
+        self._invalidate_data_array_headers()
         #reapply default config
         if self.__configDefaultActiveFlag:
             config = self.__control.config()
@@ -1774,6 +2569,35 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
                 header_map[key] = val
             saving.updateFrameHeader(imageId,header_map)
 
+    ##@brief set the headers of a batch of images
+    #
+    # the headers are given as a table, without any string to parse:
+    # argin[0] the image ids, argin[1] the keys followed by one row of
+    # values per image id. An empty value is not set.
+    @Core.DEB_MEMBER_FUNCT
+    def setImageHeaderTable(self,argin) :
+        imageIds, strings = argin
+        nbImages = len(imageIds)
+        nbKeys, remainder = divmod(len(strings), nbImages + 1)
+        if remainder:
+            PyTango.Except.throw_exception('WrongData',
+                                           'Wrong value image header table: %d strings for %d images' % (len(strings), nbImages),
+                                           'LimaCCD Class')
+        keys = strings[:nbKeys]
+        if not all(keys):
+            PyTango.Except.throw_exception('WrongData',
+                                           'Wrong value image header table: empty key',
+                                           'LimaCCD Class')
+        saving = self.__control.saving()
+        for i, imageId in enumerate(imageIds):
+            begin = (i + 1) * nbKeys
+            values = strings[begin:begin + nbKeys]
+            if all(values):
+                header_map = dict(zip(keys, values))
+            else:
+                header_map = dict([(k, v) for k, v in zip(keys, values) if v])
+            saving.updateFrameHeader(int(imageId), header_map)
+
     ##@brief reset common header
     #
     @Core.DEB_MEMBER_FUNCT
@@ -1804,10 +2628,49 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
 
     ##@brief get a DATA_ARRAY from a Data object
     #
+    #@params out the buffer returned by a previous call, reused if the
+    #        size matches so that no new allocation is needed
     @Core.DEB_MEMBER_FUNCT
-    def _image_2_data_array(self, data, category):
-        d = data.buffer
-        s = [d.shape[i] for i in range(len(d.shape) - 1, -1, -1)]
+    def _image_2_data_array(self, data, category, out=None):
+        try:
+            return self._array_2_data_array(data.buffer, category, out)
+        finally:
+            _release_data(data)
+
+    ##@brief forget the DATA_ARRAY headers built so far
+    #
+    # must be called each time the image shape or type may change
+    def _invalidate_data_array_headers(self):
+        self.__data_array_image_type = None
+        self.__data_array_headers = {}
+
+    ##@brief get the DATA_ARRAY header for an array
+    #
+    # headers are cached by (shape, image type, category) as they are
+    # the same for all the frames of an acquisition.
+    # if from_dtype is True the data type comes from the numpy dtype
+    # and not from the Lima image type
+    def _get_data_array_header(self, shape, dtype, category, from_dtype=False):
+        if from_dtype:
+            imageType = None
+        else:
+            imageType = self.__data_array_image_type
+            if imageType is None:
+                image = self.__control.image()
+                imageType = image.getImageType()
+                self.__data_array_image_type = imageType
+        key = (shape, imageType, category, dtype.str)
+        header = self.__data_array_headers.get(key)
+        if header is None:
+            header = self._build_data_array_header(shape, dtype,
+                                                   imageType, category)
+            self.__data_array_headers[key] = header
+        return header
+
+    ##@brief pack a DATA_ARRAY header
+    #
+    def _build_data_array_header(self, shape, dtype, imageType, category):
+        s = [shape[i] for i in range(len(shape) - 1, -1, -1)]
         if (category == self.DataArrayCategory.ImageStack) and (len(s) == 2):
             s += [1]
         nbDim = len(s)
@@ -1815,13 +2678,17 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         if nbDim > maxNbDim:
             raise ValueError('Invalid nb of dimensions: max is %d' % maxNbDim)
 
-        image = self.__control.image()
-        imageType = image.getImageType()
-        dataType = self.ImageType2DataArrayType.get(imageType, -1)
-        bigEndian = numpy.dtype(d.dtype.byteorder + 'i4') == numpy.dtype('>i4')
+        if imageType is None:
+            dtypeKey = '%s%d' % (dtype.kind, dtype.itemsize)
+            dataType = self.DType2DataArrayType.get(dtypeKey, -1)
+            pixelSize = dtype.itemsize
+        else:
+            dataType = self.ImageType2DataArrayType.get(imageType, -1)
+            pixelSize = self.ImageType2NbBytes.get(imageType, (1, 0))[0]
+        bigEndian = numpy.dtype(dtype.byteorder + 'i4') == numpy.dtype('>i4')
 
         def steps_gen(s):
-            size = self.ImageType2NbBytes.get(imageType, (1, 0))[0]
+            size = pixelSize
             for x in s:
                 yield size
                 size *= x
@@ -1846,17 +2713,120 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         if len(dataheader) != self.DataArrayHeaderLen:
             raise RuntimeError('Invalid header len: %d (expected %d)' % \
                   (len(dataheader), self.DataArrayHeaderLen))
+        return dataheader
 
-        flatData = d.ravel()
-        flatData.dtype = numpy.uint8
-        
-        dataStr = dataheader + flatData.tostring()        
-        release = getattr(data, 'releaseBuffer', None)
-        if release:
-            release()
-        
-        return dataStr
-  
+    ##@brief get the DevEncoded format and data of a DATA_ARRAY
+    #
+    # compress the DATA_ARRAY if the image_compression attribute is set
+    def _encode_data_array(self, data_array):
+        codec = self.__image_compression
+        if codec == 'NONE':
+            return 'DATA_ARRAY', data_array
+        header = struct.unpack_from(self.DataArrayPackStr, data_array)
+        headerLen, firstStep = header[2], header[13]
+        return self.__compressor.compress(codec, data_array, headerLen,
+                                          firstStep)
+
+    ##@brief fill a DATA_ARRAY buffer from a numpy array
+    #
+    # The header is copied in front of the pixels and the pixels are
+    # copied straight from the source array, so the only copy is the
+    # one into the returned bytearray
+    def _array_2_data_array(self, d, category, out=None, from_dtype=False):
+        out, pixels = self._alloc_data_array(d.shape, d.dtype, category,
+                                             out, from_dtype)
+        pixels[...] = d
+        return out
+
+    ##@brief get a DATA_ARRAY buffer with its header filled
+    #
+    #@return the buffer and a numpy view of its (unset) pixels
+    def _alloc_data_array(self, shape, dtype, category, out=None,
+                          from_dtype=False):
+        dataheader = self._get_data_array_header(shape, dtype, category,
+                                                 from_dtype)
+        headerLen = len(dataheader)
+        count = int(numpy.prod(shape))
+        size = headerLen + count * dtype.itemsize
+        if out is None or len(out) != size:
+            out = bytearray(size)
+        out[:headerLen] = dataheader
+
+        pixels = numpy.frombuffer(out, dtype, count, headerLen)
+        pixels.shape = shape
+        return out, pixels
+
+    ##@brief get a DATA_ARRAY ImageStack from a list of frames
+    #
+    # a contiguous sequence is read in one go, otherwise each frame is
+    # copied in its slot of the stack and released before the next one
+    def _frame_list_2_data_array(self, frames, out=None):
+        frames = list(frames)
+        nbFrames = len(frames)
+        if not nbFrames:
+            raise ValueError('Empty image sequence')
+        category = self.DataArrayCategory.ImageStack
+        start = frames[0]
+        if frames == list(range(start, start + nbFrames)):
+            imageStack = self.__control.ReadImage(start, nbFrames)
+            return self._image_2_data_array(imageStack, category, out)
+
+        stack = None
+        for i, frame_number in enumerate(frames):
+            data = self.__control.ReadImage(frame_number)
+            try:
+                d = data.buffer
+                if stack is None:
+                    shape = (nbFrames,) + d.shape
+                    out, stack = self._alloc_data_array(shape, d.dtype,
+                                                        category, out)
+                stack[i] = d
+            finally:
+                _release_data(data)
+        return out
+
+    ##@brief get a DATA_ARRAY ImageStack of reduced groups of frames
+    #
+    # each group of nb_per_group consecutive frames (the last one may
+    # be smaller) is reduced to one frame with mode SUM, MEAN or MAX
+    def _reduced_seq_2_data_array(self, start, end, nb_per_group, mode,
+                                  out=None):
+        if nb_per_group < 1:
+            raise ValueError('Invalid nb of frames per group: %d' % nb_per_group)
+        if mode not in ('SUM', 'MEAN', 'MAX'):
+            raise ValueError('Invalid reduction mode: %s' % mode)
+        nbGroups = (end - start + nb_per_group - 1) // nb_per_group
+        if nbGroups <= 0:
+            raise ValueError('Empty image sequence')
+        category = self.DataArrayCategory.ImageStack
+        stack = None
+        for g in range(nbGroups):
+            first = start + g * nb_per_group
+            nbFrames = min(nb_per_group, end - first)
+            data = self.__control.ReadImage(first, nbFrames)
+            try:
+                d = data.buffer
+                frameShape = d.shape[-2:]
+                d = d.reshape((nbFrames,) + frameShape)
+                if stack is None:
+                    shape = (nbGroups,) + frameShape
+                    if mode == 'MAX':
+                        out, stack = self._alloc_data_array(shape, d.dtype,
+                                                            category, out)
+                    else:
+                        dtype = numpy.dtype(numpy.float64)
+                        out, stack = self._alloc_data_array(shape, dtype,
+                                                            category, out,
+                                                            True)
+                if mode == 'SUM':
+                    numpy.sum(d, axis=0, dtype=numpy.float64, out=stack[g])
+                elif mode == 'MEAN':
+                    numpy.mean(d, axis=0, dtype=numpy.float64, out=stack[g])
+                else:
+                    numpy.amax(d, axis=0, out=stack[g])
+            finally:
+                _release_data(data)
+        return out
 
     ##@brief get image data
     #
@@ -1865,30 +2835,276 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         deb.Param('readImage: frame_number=%d' % frame_number)
         image = self.__control.ReadImage(frame_number)
         category = self.DataArrayCategory.Image
-        self._datacache = self._image_2_data_array(image, category)
-        return ('DATA_ARRAY',  self._datacache)  
+        self._datacache = self._image_2_data_array(image, category,
+                                                   self._datacache)
+        return self._encode_data_array(self._datacache)
   
-    ##@brief get the data for an image sequence 
+    ##@brief start,end[,step] of an image sequence command
     #
-    @Core.DEB_MEMBER_FUNCT
-    def readImageSeq(self, frame_seq):
-        deb.Param('frame_seq=%s' % frame_seq)
-        frame_seq = map(int, frame_seq)
+    #@return (start, end, step)
+    def _frame_seq_2_range(self, frame_seq):
+        frame_seq = [int(x) for x in frame_seq]
         start, end = frame_seq[:2]
         step = 1
         if len(frame_seq) > 2:
             step = frame_seq[2]
-            if step != 1:
-                raise ValueError('Discontiguous sequences not supported yet')
-        nbFrames = end - start
+            if step < 1:
+                raise ValueError('Invalid sequence step: %d' % step)
+        return start, end, step
+
+    ##@brief get the data for an image sequence 
+    #
+    @Core.DEB_MEMBER_FUNCT
+    def readImageSeq(self, frame_seq):
+        deb.Param('frame_seq=%s' % frame_seq)
+        start, end, step = self._frame_seq_2_range(frame_seq)
+        frames = range(start, end, step)
         deb.Param('readImageSeq:start,end,step = %d,%d,%d (%d frames)' % \
+                  (start, end, step, len(frames)))
+        self._dataseqcache = self._frame_list_2_data_array(frames,
+                                                           self._dataseqcache)
+        return self._encode_data_array(self._dataseqcache)  
+
+    ##@brief get the data for an image sequence with the image counters
+    # and the results of the active plugins for the same frames
+    #
+    # see the DATA_BUNDLE DevEncoded description
+    #@params frame_seq start,end[,step]
+    @Core.DEB_MEMBER_FUNCT
+    def readImageSeqCounters(self, frame_seq):
+        deb.Param('readImageSeqCounters: frame_seq=%s' % frame_seq)
+        start, end, step = self._frame_seq_2_range(frame_seq)
+        frames = range(start, end, step)
+        if not len(frames):
+            raise ValueError('Empty image sequence')
+        status = self.__control.getStatus()
+        counters = status.ImageCounters
+
+        first, last = frames[0], frames[-1] + 1
+        sections = []
+        blobs = []
+        for name, dev in self._get_plugin_result_devices():
+            results = dev.get_frame_results(first, last)
+            if results is None:
+                continue
+            columns, rows = results
+            if step != 1 and 'frame' in columns:
+                frame_col = rows[:, columns.index('frame')]
+                rows = rows[numpy.isin(frame_col, frames)]
+            rows = numpy.ascontiguousarray(rows, dtype='<f8')
+            sections.append({'name' : name,
+                             'format' : 'FLOAT64',
+                             'columns' : list(columns),
+                             'shape' : list(rows.shape)})
+            blobs.append(rows)
+
+        directory = {
+            'acq_status' : _acqstate2string(status.AcquisitionStatus),
+            'image_counters' : {
+                'last_base_image_ready' : counters.LastBaseImageReady,
+                'last_counter_ready' : counters.LastCounterReady,
+                'last_image_acquired' : counters.LastImageAcquired,
+                'last_image_ready' : counters.LastImageReady,
+                'last_image_saved' : counters.LastImageSaved,
+                },
+            'frames' : [start, end, step],
+            'sections' : sections}
+
+        if self.__image_compression == 'NONE':
+            return 'DATA_BUNDLE', self._build_image_data_bundle(directory,
+                                                                frames, blobs)
+        self._databundlecache = self._frame_list_2_data_array(
+            frames, self._databundlecache)
+        images_format, images = self._encode_data_array(self._databundlecache)
+        sections.insert(0, {'name' : 'images', 'format' : images_format})
+        return 'DATA_BUNDLE', self._build_data_bundle(directory,
+                                                      [images] + blobs)
+
+    ##@brief the running plugin devices which can give per-frame results
+    #
+    # the live devices of the server, as the default plugin devices are
+    # created after the database lookup of get_sub_devices
+    #@return a list of (plugin type, device)
+    def _get_plugin_result_devices(self):
+        return [(name, dev) for name, dev in self._get_plugin_devices()
+                if hasattr(dev, 'get_frame_results') and
+                dev.get_state() == PyTango.DevState.ON]
+
+    ##@brief the plugin devices of the server
+    #
+    #@return a list of (plugin type, device)
+    def _get_plugin_devices(self):
+        util = PyTango.Util.instance()
+        devices = []
+        for dev in util.get_device_list('*'):
+            class_name = dev.__class__.__name__
+            if not class_name.endswith('DeviceServer'):
+                continue
+            devices.append((class_name.lower().replace('deviceserver',''), dev))
+        return sorted(devices, key=lambda x: x[0])
 
-                  (start, end, step, nbFrames))
-        imageStack = self.__control.ReadImage(start, nbFrames)
+    ##@brief allocate a DATA_BUNDLE and write its header and directory
+    #
+    # each blob offset and size is added to its section
+    #@return the bundle and the absolute offset of each blob
+    def _alloc_data_bundle(self, directory, sizes):
+        align = self.DataBundleAlign
+        offset = 0
+        for section, size in zip(directory['sections'], sizes):
+            section['offset'] = offset
+            section['size'] = size
+            offset += size + (-size % align)
+        json_str = json.dumps(directory).encode()
+        json_str += b' ' * (-(self.DataBundleHeaderLen + len(json_str)) % align)
+        data_offset = self.DataBundleHeaderLen + len(json_str)
+
+        out = bytearray(data_offset + offset)
+        struct.pack_into(self.DataBundlePackStr, out, 0,
+                         self.DataBundleMagic,
+                         self.DataBundleVersion,
+                         self.DataBundleHeaderLen,
+                         len(json_str))
+        out[self.DataBundleHeaderLen:data_offset] = json_str
+        return out, [data_offset + section['offset']
+                     for section in directory['sections']]
+
+    ##@brief pack a DATA_BUNDLE
+    #
+    def _build_data_bundle(self, directory, blobs):
+        blobs = [_blob_2_uint8(blob) for blob in blobs]
+        out, offsets = self._alloc_data_bundle(directory,
+                                               [blob.nbytes for blob in blobs])
+        self._write_data_bundle_blobs(out, offsets, blobs)
+        return out
+
+    def _write_data_bundle_blobs(self, out, offsets, blobs):
+        data = numpy.frombuffer(out, dtype=numpy.uint8)
+        for offset, blob in zip(offsets, blobs):
+            blob = _blob_2_uint8(blob)
+            data[offset:offset + blob.nbytes] = blob
+
+    ##@brief pack a DATA_BUNDLE with the frames as DATA_ARRAY first section
+    #
+    # the pixels are copied from the Lima buffers straight into the bundle
+    def _build_image_data_bundle(self, directory, frames, blobs):
+        frames = list(frames)
+        nbFrames = len(frames)
+        start = frames[0]
+        contiguous = frames == list(range(start, start + nbFrames))
         category = self.DataArrayCategory.ImageStack
-        self._dataseqcache = self._image_2_data_array(imageStack, category)
-        return ('DATA_ARRAY',  self._dataseqcache)  
-  
+        data = self.__control.ReadImage(start, nbFrames if contiguous else 1)
+        try:
+            d = data.buffer
+            shape = d.shape if contiguous else (nbFrames,) + d.shape
+            dataheader = self._get_data_array_header(shape, d.dtype, category)
+            count = int(numpy.prod(shape))
+            directory['sections'].insert(0, {'name' : 'images',
+                                             'format' : 'DATA_ARRAY'})
+            out, offsets = self._alloc_data_bundle(
+                directory,
+                [len(dataheader) + count * d.dtype.itemsize] +
+                [blob.nbytes for blob in blobs])
+            offset = offsets[0]
+            out[offset:offset + len(dataheader)] = dataheader
+            stack = numpy.frombuffer(out, d.dtype, count,
+                                     offset + len(dataheader))
+            stack.shape = shape
+            if contiguous:
+                stack[...] = d
+            else:
+                stack[0] = d
+        finally:
+            _release_data(data)
+        for i, frame_number in enumerate(frames[1:] if not contiguous else [], 1):
+            data = self.__control.ReadImage(frame_number)
+            try:
+                stack[i] = data.buffer
+            finally:
+                _release_data(data)
+        self._write_data_bundle_blobs(out, offsets[1:], blobs)
+        return out
+
+    ##@brief get the data for an arbitrary list of images
+    #
+    @Core.DEB_MEMBER_FUNCT
+    def readImageList(self, frame_list):
+        deb.Param('readImageList: frame_list=%s' % frame_list)
+        frames = [int(x) for x in frame_list]
+        self._dataseqcache = self._frame_list_2_data_array(frames,
+                                                           self._dataseqcache)
+        return self._encode_data_array(self._dataseqcache)
+
+    ##@brief start a chunked read of an image sequence
+    #
+    # the chunk size is chosen by the server so that each
+    # readImageSeqNext reply stays below the ImageSeqChunkSize property
+    #@return [cursor id, nb frames, nb frames per chunk]
+    @Core.DEB_MEMBER_FUNCT
+    def readImageSeqBegin(self, frame_seq):
+        frames = range(*self._frame_seq_2_range(frame_seq))
+        if not len(frames):
+            raise ValueError('Empty image sequence')
+
+        frame_size = self.__control.image().getImageDim().getMemSize()
+        chunk_frames = max(1, int(self.ImageSeqChunkSize) // max(1, frame_size))
+
+        cursors = self.__image_seq_cursors
+        while len(cursors) >= self.MaxImageSeqCursors:
+            cursors.popitem(last=False)
+        cursor_id = next(self.__image_seq_cursor_id)
+        cursors[cursor_id] = [frames, 0, chunk_frames]
+        deb.Param('readImageSeqBegin: cursor=%d, %d frames, %d per chunk' % \
+                  (cursor_id, len(frames), chunk_frames))
+        return [cursor_id, len(frames), chunk_frames]
+
+    ##@brief get the next chunk of an image sequence
+    #
+    # the cursor is removed once its last chunk has been returned,
+    # and all the cursors are removed by prepareAcq
+    @Core.DEB_MEMBER_FUNCT
+    def readImageSeqNext(self, cursor_id):
+        cursor = self.__image_seq_cursors.get(cursor_id)
+        if cursor is None:
+            raise ValueError('Invalid or finished image sequence cursor: %d' % \
+                             cursor_id)
+        frames, index, chunk_frames = cursor
+        chunk = frames[index:index + chunk_frames]
+        deb.Param('readImageSeqNext: cursor=%d, frames %d to %d' % \
+                  (cursor_id, chunk[0], chunk[-1]))
+        # the cursor only moves once the chunk is read, a frame not yet
+        # acquired can be retried
+        self._dataseqchunkcache = self._frame_list_2_data_array(
+            chunk, self._dataseqchunkcache)
+        data = self._encode_data_array(self._dataseqchunkcache)
+        index += len(chunk)
+        if index >= len(frames):
+            self.__image_seq_cursors.pop(cursor_id, None)
+        else:
+            cursor[1] = index
+        return data
+
+    ##@brief abandon a chunked read of an image sequence
+    #
+    @Core.DEB_MEMBER_FUNCT
+    def readImageSeqEnd(self, cursor_id):
+        self.__image_seq_cursors.pop(cursor_id, None)
+
+    ##@brief get an image sequence reduced by groups of frames
+    #
+    #@params argin [start,end,nb frames per group],[SUM|MEAN|MAX]
+    @Core.DEB_MEMBER_FUNCT
+    def readImageSeqReduced(self, argin):
+        frame_seq, modes = argin
+        frame_seq = [int(x) for x in frame_seq]
+        if len(frame_seq) != 3 or len(modes) != 1:
+            raise ValueError('should be [start,end,nb frames per group],[mode]')
+        start, end, nb_per_group = frame_seq
+        mode = modes[0].upper()
+        deb.Param('readImageSeqReduced:start,end,group,mode = %d,%d,%d,%s' % \
+                  (start, end, nb_per_group, mode))
+        self._dataseqcache = self._reduced_seq_2_data_array(
+            start, end, nb_per_group, mode, self._dataseqcache)
+        return self._encode_data_array(self._dataseqcache)
 
     ##@brief get base image data
     #
@@ -1900,6 +3116,18 @@ class LimaCCDs(PyTango.LatestDeviceImpl) :
         self.__dataflat_cache.dtype = numpy.uint8
         return self.__dataflat_cache
 
+    ##@brief get base image data as DATA_ARRAY
+    #
+    #image before post processing
+    @Core.DEB_MEMBER_FUNCT
+    def readBaseImage(self,frame_number):
+        deb.Param('readBaseImage: frame_number=%d' % frame_number)
+        image = self.__control.ReadBaseImage(frame_number)
+        category = self.DataArrayCategory.Image
+        self._basedatacache = self._image_2_data_array(image, category,
+                                                       self._basedatacache)
+        return self._encode_data_array(self._basedatacache)
+
     ##@brief manual write image
     #
     #
@@ -2064,14 +3292,62 @@ class LimaCCDsClass(PyTango.DeviceClass) :
         'TangoEvent' :
         [PyTango.DevBoolean,
          "Activate Tango event",[False]],
+        'VideoPyramidEvent' :
+        [PyTango.DevBoolean,
+         "Push the video_last_image_<n> events, with TangoEvent",[False]],
         'SavingMaxConcurrentWritingTask':
         [PyTango.DevShort,
          "Maximum concurrent writing tasks",[1]],
+        'StatusCacheTime':
+        [PyTango.DevLong,
+         "Time in us a status snapshot is shared by successive attribute reads",[0]],
+        'FrameLatencyRingSize':
+        [PyTango.DevLong,
+         "Number of frames kept for the latency statistics",[1024]],
+        'ImageEventsQueueSize':
+        [PyTango.DevLong,
+         "Max nb of image status waiting for the event dispatch thread",[64]],
+        'ImageShmExportName':
+        [PyTango.DevString,
+         "Name of the image export shared memory, default is lima_<device name>",[]],
+        'ImageShmExportNbSlots':
+        [PyTango.DevLong,
+         "Number of frames in the image export shared memory",[16]],
+        'ImageShmExportDirectory':
+        [PyTango.DevString,
+         "Directory of the image export shared memory, default is /dev/shm or the temporary directory",[]],
+        'NbCompressionThread':
+        [PyTango.DevLong,
+         "Number of thread for DATA_ARRAY compression",[2]],
+        'NbPreviewThread':
+        [PyTango.DevLong,
+         "Number of thread for the image preview encoding",[2]],
+        'ImageSeqChunkSize':
+        [PyTango.DevLong,
+         "Maximum size in bytes of a readImageSeqNext chunk",[32 * 1024 * 1024]],
         }
 
     #    Command definitions
     cmd_list = {
         'gc':
+        [[PyTango.DevVoid, ""],
+         [PyTango.DevVoid, ""]],
+        'profilerStart':
+        [[PyTango.DevVoid, ""],
+         [PyTango.DevVoid, ""]],
+        'profilerStop':
+        [[PyTango.DevVoid, ""],
+         [PyTango.DevString, "profile statistics"]],
+        'getCallStatistics':
+        [[PyTango.DevVoid, ""],
+         [PyTango.DevVarDoubleStringArray, "[nb calls,total time,max time per method],[method names]"]],
+        'resetCallStatistics':
+        [[PyTango.DevVoid, ""],
+         [PyTango.DevVoid, ""]],
+        'getFrameLatency':
+        [[PyTango.DevVoid, ""],
+         [PyTango.DevVarDoubleArray, "frame,acquired,base ready,ready,counter ready,saved times per frame"]],
+        'resetFrameLatency':
         [[PyTango.DevVoid, ""],
          [PyTango.DevVoid, ""]],
         'openShutterManual':
@@ -2083,6 +3359,12 @@ class LimaCCDsClass(PyTango.DeviceClass) :
         'getAttrStringValueList':
         [[PyTango.DevString, "Attribute name"],
          [PyTango.DevVarStringArray, "Authorized String value list"]],
+        'getAttributeSnapshot':
+        [[PyTango.DevVoid, ""],
+         [PyTango.DevString, "JSON object {attribute name : value}"]],
+        'setAttributeSnapshot':
+        [[PyTango.DevString, "JSON object {attribute name : value}"],
+         [PyTango.DevVoid, ""]],
         'prepareAcq':
         [[PyTango.DevVoid,""],
          [PyTango.DevVoid,""]],
@@ -2101,6 +3383,9 @@ class LimaCCDsClass(PyTango.DeviceClass) :
         'setImageHeader':
         [[PyTango.DevVarStringArray,"ImageId0 SEPARATOR imageHeader0,ImageId1 SEPARATOR imageHeader1..."],
          [PyTango.DevVoid,""]],
+        'setImageHeaderTable':
+        [[PyTango.DevVarLongStringArray,"[ImageId0,ImageId1...],[key0,key1...,value00,value01...,value10,value11...]"],
+         [PyTango.DevVoid,""]],
         'resetCommonHeader':
         [[PyTango.DevVoid,""],
          [PyTango.DevVoid,""]],
@@ -2131,6 +3416,27 @@ class LimaCCDsClass(PyTango.DeviceClass) :
         'readImageSeq':
         [[PyTango.DevVarLongArray,"Image id seq: start,end[,step]"],
          [PyTango.DevEncoded, "DATA_ARRAY with requested images"]],
+        'readBaseImage':
+        [[PyTango.DevLong,"Image id"],
+         [PyTango.DevEncoded, "DATA_ARRAY with requested base image"]],
+        'readImageSeqBegin':
+        [[PyTango.DevVarLongArray,"Image id seq: start,end[,step]"],
+         [PyTango.DevVarLongArray,"cursor id,nb frames,nb frames per chunk"]],
+        'readImageSeqNext':
+        [[PyTango.DevLong,"cursor id"],
+         [PyTango.DevEncoded, "DATA_ARRAY with the next chunk of images"]],
+        'readImageSeqEnd':
+        [[PyTango.DevLong,"cursor id"],
+         [PyTango.DevVoid,""]],
+        'readImageList':
+        [[PyTango.DevVarLongArray,"Image id list"],
+         [PyTango.DevEncoded, "DATA_ARRAY with requested images"]],
+        'readImageSeqCounters':
+        [[PyTango.DevVarLongArray,"Image sequence: start,end[,step]"],
+         [PyTango.DevEncoded, "DATA_BUNDLE with images, image counters and plugin results"]],
+        'readImageSeqReduced':
+        [[PyTango.DevVarLongStringArray,"[start,end,nb frames per group],[SUM|MEAN|MAX]"],
+         [PyTango.DevEncoded, "DATA_ARRAY with one reduced image per group"]],
         'getPluginDeviceNameFromType':
         [[PyTango.DevString,"plugin type"],
          [PyTango.DevString,"device name"]],
@@ -2367,6 +3673,58 @@ class LimaCCDsClass(PyTango.DeviceClass) :
         [[PyTango.DevFloat,
           PyTango.SCALAR,
           PyTango.READ_WRITE]],
+        'image_events_queue_depth':
+        [[PyTango.DevLong,
+          PyTango.SCALAR,
+          PyTango.READ]],
+        'image_events_dropped':
+        [[PyTango.DevLong64,
+          PyTango.SCALAR,
+          PyTango.READ]],
+        'image_events_latency':
+        [[PyTango.DevDouble,
+          PyTango.SPECTRUM,
+          PyTango.READ,2],
+         {
+             'label':"Event dispatch latency: last, max",
+             'unit':"second",
+             'standard unit':"second",
+             'display unit':"second",
+             'format':"%f",
+             'description':"delay between an image status callback and the push of its events",
+         }],
+        'image_preview':
+        [[PyTango.DevEncoded,
+          PyTango.SCALAR,
+          PyTango.READ],
+         {
+             'label':"last image preview",
+             'description':"JPEG or PNG of the last image ready, scaled to 8 bits grey",
+             }],
+        'image_preview_format':
+        [[PyTango.DevString,
+          PyTango.SCALAR,
+          PyTango.READ_WRITE]],
+        'image_preview_scaling':
+        [[PyTango.DevString,
+          PyTango.SCALAR,
+          PyTango.READ_WRITE]],
+        'image_preview_quality':
+        [[PyTango.DevLong,
+          PyTango.SCALAR,
+          PyTango.READ_WRITE]],
+        'image_shm_export_active':
+        [[PyTango.DevBoolean,
+          PyTango.SCALAR,
+          PyTango.READ_WRITE]],
+        'image_shm_export_descriptor':
+        [[PyTango.DevString,
+          PyTango.SCALAR,
+          PyTango.READ]],
+        'image_compression':
+        [[PyTango.DevString,
+          PyTango.SCALAR,
+          PyTango.READ_WRITE]],
         'ready_for_next_image':
         [[PyTango.DevBoolean,
           PyTango.SCALAR,
@@ -2427,6 +3785,26 @@ class LimaCCDsClass(PyTango.DeviceClass) :
         [[PyTango.DevDouble,
           PyTango.SPECTRUM,
           PyTango.READ,4]],
+        'latency_frame_period':
+        [[PyTango.DevDouble,
+          PyTango.SPECTRUM,
+          PyTango.READ,3]],
+        'latency_base_image_ready':
+        [[PyTango.DevDouble,
+          PyTango.SPECTRUM,
+          PyTango.READ,3]],
+        'latency_image_ready':
+        [[PyTango.DevDouble,
+          PyTango.SPECTRUM,
+          PyTango.READ,3]],
+        'latency_counter_ready':
+        [[PyTango.DevDouble,
+          PyTango.SPECTRUM,
+          PyTango.READ,3]],
+        'latency_image_saved':
+        [[PyTango.DevDouble,
+          PyTango.SPECTRUM,
+          PyTango.READ,3]],
         'saving_statistics_history':
         [[PyTango.DevLong,
           PyTango.SCALAR,
@@ -2503,6 +3881,34 @@ class LimaCCDsClass(PyTango.DeviceClass) :
              'format':"%d",
              'description':"video image as encoded",
              }],
+        'video_last_image_2':
+        [[PyTango.DevEncoded,
+          PyTango.SCALAR,
+          PyTango.READ],
+         {
+             'label':"the video image binned 2x2",
+             'description':"video image binned 2x2 as encoded",
+             }],
+        'video_last_image_4':
+        [[PyTango.DevEncoded,
+          PyTango.SCALAR,
+          PyTango.READ],
+         {
+             'label':"the video image binned 4x4",
+             'description':"video image binned 4x4 as encoded",
+             }],
+        'video_last_image_8':
+        [[PyTango.DevEncoded,
+          PyTango.SCALAR,
+          PyTango.READ],
+         {
+             'label':"the video image binned 8x8",
+             'description':"video image binned 8x8 as encoded",
+             }],
+        'video_pipeline_mode':
+        [[PyTango.DevString,
+          PyTango.SCALAR,
+          PyTango.READ_WRITE]],
         'video_last_image_counter':
         [[PyTango.DevLong64,
           PyTango.SCALAR,
@@ -2565,6 +3971,8 @@ def declare_camera_n_commun_to_tango_world(util) :
                     specificClass, specificDevice = class_info
                 else:
                     specificClass, specificDevice = class_info.TangoClassClass, class_info
+                instrument_device_class(specificDevice,
+                                        getattr(specificClass, 'cmd_list', {}))
                 util.add_class(specificClass, specificDevice)
             try:
                 func = getattr(m, 'get_taco_specific_cmd_list_n_proxy_cont')
@@ -2602,6 +4010,9 @@ def declare_camera_n_commun_to_tango_world(util) :
                     specificClass, specificDevice = class_info
                 else:
                     specificClass, specificDevice = class_info.TangoClassClass, class_info
+                instrument_device_class(specificDevice,
+                                        getattr(specificClass, 'cmd_list', {}))
+                instrument_task_classes(m, ProcesslibTaskClasses)
                 util.add_class(specificClass, specificDevice)
     if warningFlag and verboseLevel < 4:
         print ("For more plugins dependency information start server with -v4")
@@ -2685,27 +4096,102 @@ def _getLastFileNumber(prefix,suffix,filesPath) :
                 lastNumber = number
     return lastNumber
 
+def _release_data(data) :
+    release = getattr(data, 'releaseBuffer', None)
+    if release:
+        release()
+
 def _allowed(*args) :
     return True
 
 def _not_allowed(*args) :
     return False
 
+VIDEO_HEADER_STRUCT = struct.Struct('!IHHqiiHHHH')
+VIDEO_ENDIANNESS = ord(struct.pack('=H',1).decode()[-1])
+
 def _video_image_2_struct(image):
-    VIDEO_HEADER_FORMAT = '!IHHqiiHHHH'
-    videoheader = struct.pack(
-            VIDEO_HEADER_FORMAT,
+    return _video_buffer_2_struct(image.mode(), image.frameNumber(),
+                                  image.width(), image.height(),
+                                  image.buffer())
+
+def _video_buffer_2_struct(mode, frameNumber, width, height, buffer):
+    headerLen = VIDEO_HEADER_STRUCT.size
+    videoimage = bytearray(headerLen + len(buffer))
+    VIDEO_HEADER_STRUCT.pack_into(
+            videoimage, 0,
             0x5644454f,                           # Magic
             1,                                    # header version
-            image.mode(),                         # image mode (Y8,Y16...)
-            image.frameNumber(),                  # frame number
-            image.width(),                        # width
-            image.height(),                       # height
-            ord(struct.pack('=H',1).decode()[-1]),         # endianness
-            struct.calcsize(VIDEO_HEADER_FORMAT), # header size
+            mode,                                 # image mode (Y8,Y16...)
+            frameNumber,                          # frame number
+            width,                                # width
+            height,                               # height
+            VIDEO_ENDIANNESS,                     # endianness
+            headerLen,                            # header size
             0,0)                                  # padding
+    videoimage[headerLen:] = buffer
+    return videoimage
 
-    return videoheader + image.buffer()
+# pixel type of the monochrome video modes, the only ones which can be binned
+VIDEO_MODE_2_DTYPE = {}
+for _mode, _dtype in (('Y8', 'u1'), ('Y16', 'u2'), ('Y32', 'u4'), ('Y64', 'u8')):
+    if hasattr(Core, _mode):
+        VIDEO_MODE_2_DTYPE[int(getattr(Core, _mode))] = numpy.dtype(_dtype)
+
+## @brief bin a packed VIDEO_IMAGE by increasing power of 2 factors
+#
+# each level is the rounded block mean of the previous one
+#@return a dict {factor : packed VIDEO_IMAGE} or None for color modes
+def _video_struct_2_pyramid(videoimage, factors):
+    (magic, version, mode, frameNumber, width, height,
+     endianness, headerLen, pad1, pad2) = VIDEO_HEADER_STRUCT.unpack_from(videoimage)
+    dtype = VIDEO_MODE_2_DTYPE.get(mode)
+    if dtype is None:
+        return None
+    # wide enough accumulator for a 8x8 block
+    sum_dtype = {1 : numpy.uint32, 2 : numpy.uint32,
+                 4 : numpy.uint64, 8 : numpy.float64}[dtype.itemsize]
+    data = numpy.frombuffer(videoimage, dtype, width * height, headerLen)
+    data = data.reshape(height, width)
+    levels = {}
+    level = 1
+    for factor in sorted(factors):
+        step = factor // level
+        h, w = data.shape[0] // step, data.shape[1] // step
+        if not h or not w:
+            break
+        blocks = data[:h * step, :w * step].reshape(h, step, w, step)
+        nb = step * step
+        data = ((blocks.sum(axis=(1, 3), dtype=sum_dtype) + nb // 2) // nb).astype(dtype)
+        level = factor
+        levels[factor] = _video_buffer_2_struct(mode, frameNumber, w, h,
+                                                data.reshape(-1).view(numpy.uint8))
+    return levels
+
+## @brief flat uint8 view of a DATA_BUNDLE blob (numpy array or bytes)
+def _blob_2_uint8(blob):
+    if not isinstance(blob, numpy.ndarray):
+        blob = numpy.frombuffer(blob, dtype=numpy.uint8)
+    return blob.reshape(-1).view(numpy.uint8)
+
+## @brief attribute stand-in to call the read_/write_ methods directly
+class _AttrValue:
+    def __init__(self, value=None):
+        self.value = value
+
+    def set_value(self, value, *dims):
+        self.value = value
+
+    def get_write_value(self):
+        return self.value
+
+def _json_default(value):
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return str(value)
 
 def _acqstate2string(state):
     state2string = {Core.AcqReady : "Ready",
@@ -2788,6 +4274,10 @@ def main(args=None) :
 
     try:
         py = PyTango.Util(args)
+        instrument_device_class(LimaCCDs, LimaCCDsClass.cmd_list)
+        instrument_callback_class(LimaCCDs.VideoImageCallback, ('newImage',))
+        instrument_callback_class(LimaCCDs.ImageStatusCallback,
+                                  ('imageStatusChanged',))
         py.add_TgClass(LimaCCDsClass,LimaCCDs,'LimaCCDs')
         try:
             declare_camera_n_commun_to_tango_world(py)
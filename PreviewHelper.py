@@ -0,0 +1,178 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2017
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+#============================================================================
+#                              HELPERS
+#============================================================================
+#
+# JPEG/PNG preview of the images, for any pixel type.
+# The image is scaled to 8 bits grey (min/max or 1%-99% percentiles) then
+# encoded on a pool of threads. The last preview is cached, so all the
+# readers of the same frame with the same settings share one encoding.
+#
+# The encoders found here (PIL and PyTurboJPEG) are also used by the
+# Bpm plugin.
+#
+
+import threading
+from multiprocessing.pool import ThreadPool
+
+import numpy
+
+# PIL, py2 vs. py3
+try:
+    from PIL import Image
+except ImportError:
+    try:
+        import Image
+    except ImportError:
+        Image = None
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import BytesIO as StringIO
+
+# 3-4x faster jpeg encoding than PIL
+# https://github.com/lilohuang/PyTurboJPEG
+try:
+    from turbojpeg import TurboJPEG, TJPF_GRAY, TJSAMP_GRAY
+    turbo_jpeg = TurboJPEG()
+except ImportError:
+    turbo_jpeg = None
+
+DefaultNbThread = 2
+# the default format is the first one available
+FormatOrder = ('JPEG', 'PNG')
+
+Scalings = ('MINMAX', 'PERCENTILE')
+PercentileRange = (1, 99)
+# the percentiles are computed on a subsample of about this nb of pixels
+PercentileNbPixels = 1024 * 1024
+
+## @brief scale an image to 8 bits
+#
+#@params scaling MINMAX or PERCENTILE
+def scale_to_uint8(data, scaling='MINMAX'):
+    if scaling == 'PERCENTILE':
+        step = max(1, int(numpy.sqrt(data.size / float(PercentileNbPixels))))
+        low, high = numpy.percentile(data[::step, ::step], PercentileRange)
+    else:
+        low, high = data.min(), data.max()
+    low = float(low)
+    high = float(high)
+    if high <= low:
+        high = low + 1
+    out = data.astype(numpy.float32)
+    out -= low
+    out *= 255. / (high - low)
+    numpy.clip(out, 0, 255, out=out)
+    return out.astype(numpy.uint8)
+
+def _encode_turbo_jpeg(data, quality):
+    return turbo_jpeg.encode(data.reshape(data.shape + (1,)),
+                             quality=quality,
+                             pixel_format=TJPF_GRAY,
+                             jpeg_subsample=TJSAMP_GRAY)
+
+def _encode_pil(fmt):
+    def encode(data, quality):
+        f = StringIO()
+        image = Image.fromarray(data, 'L')
+        if fmt == 'JPEG':
+            image.save(f, 'jpeg', quality=quality)
+        else:
+            image.save(f, 'png')
+        return f.getvalue()
+    return encode
+
+def get_available_formats():
+    formats = {}
+    if turbo_jpeg is not None:
+        formats['JPEG'] = _encode_turbo_jpeg
+    elif Image is not None:
+        formats['JPEG'] = _encode_pil('JPEG')
+    if Image is not None:
+        formats['PNG'] = _encode_pil('PNG')
+    return formats
+
+## @brief encode image previews on a pool of threads
+class PreviewEncoder:
+    def __init__(self, nb_thread=DefaultNbThread):
+        self.__nb_thread = max(1, nb_thread)
+        self.__pool = None
+        self.__lock = threading.Lock()
+        self.__formats = get_available_formats()
+        self.__last = None
+
+    def formats(self):
+        return [fmt for fmt in FormatOrder if fmt in self.__formats]
+
+    def close(self):
+        with self.__lock:
+            if self.__pool is not None:
+                self.__pool.close()
+                self.__pool = None
+            self.__last = None
+
+    ## @brief drop the cached preview
+    #
+    # to be called at each new acquisition, the frame numbers restart at 0
+    def invalidate(self):
+        with self.__lock:
+            self.__last = None
+
+    ## @brief get the preview of a frame
+    #
+    #@params frame_number the frame, used as cache key
+    #@params read_image read_image(frame_number) must return the image
+    # as a 2D numpy array and a function to release it (or None)
+    #@return the encoded preview
+    def encode(self, frame_number, read_image, fmt, scaling, quality):
+        key = (frame_number, fmt, scaling, quality)
+        with self.__lock:
+            if self.__last is not None and self.__last[0] == key:
+                result = self.__last[1]
+            else:
+                if self.__pool is None:
+                    self.__pool = ThreadPool(self.__nb_thread)
+                result = self.__pool.apply_async(
+                    self.__encode, (frame_number, read_image, fmt,
+                                    scaling, quality))
+                self.__last = (key, result)
+        try:
+            return result.get()
+        except:
+            with self.__lock:
+                if self.__last is not None and self.__last[1] is result:
+                    self.__last = None
+            raise
+
+    def __encode(self, frame_number, read_image, fmt, scaling, quality):
+        data, release = read_image(frame_number)
+        try:
+            data = scale_to_uint8(data, scaling)
+        finally:
+            if release is not None:
+                release()
+        return self.__formats[fmt](data, quality)
@@ -0,0 +1,221 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2017
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+#============================================================================
+#                              HELPERS
+#============================================================================
+#
+# Profiling of the Tango requests of a running server.
+# The read_/write_ methods and the commands of the device classes are
+# wrapped by instrument_device_class(). When the profiler is stopped the
+# wrapper only checks one flag. When it is started, the outermost wrapped
+# call of each thread runs under the cProfile profiler of this thread, and
+# the profiles of all the threads are merged when it is stopped.
+# With python >= 3.12 only one thread can be profiled at a time, the calls
+# of the other threads are then not profiled.
+#
+# The wrapper also counts the calls of each method, with their total and
+# max duration (see get_call_statistics).
+#
+# The Lima and processlib callbacks (image status, video, sink tasks) are
+# wrapped the same way by instrument_callback_class.
+#
+
+import time
+import threading
+import functools
+import cProfile
+import pstats
+
+import six
+
+DefaultNbLines = 50
+
+## @brief deterministic profiler of the wrapped methods
+class RequestProfiler:
+    def __init__(self):
+        self.active = False
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+        self.__profiles = []
+
+    def start(self):
+        with self.__lock:
+            self.__profiles = []
+            self.__local = threading.local()
+            self.active = True
+
+    ## @brief stop the profiler
+    #
+    #@return the merged statistics as text, sorted by cumulative time
+    def stop(self, sort='cumulative', nb_lines=DefaultNbLines):
+        with self.__lock:
+            self.active = False
+            profiles = self.__profiles
+            self.__profiles = []
+        profiles = [p for p in profiles if p.getstats()]
+        if not profiles:
+            return 'No profiled call'
+        stream = six.StringIO()
+        stats = pstats.Stats(profiles[0], stream=stream)
+        for p in profiles[1:]:
+            stats.add(p)
+        stats.sort_stats(sort).print_stats(nb_lines)
+        return stream.getvalue()
+
+    def runcall(self, func, *args, **kwargs):
+        local = self.__local
+        if getattr(local, 'depth', 0):
+            return func(*args, **kwargs)
+        profile = getattr(local, 'profile', None)
+        if profile is None:
+            profile = cProfile.Profile()
+            with self.__lock:
+                self.__profiles.append(profile)
+            local.profile = profile
+        try:
+            profile.enable()
+        except ValueError:
+            # python >= 3.12 only profiles one thread at a time
+            return func(*args, **kwargs)
+        local.depth = 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            local.depth = 0
+            profile.disable()
+
+profiler = RequestProfiler()
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+# {method name : [nb calls, total time, max time]}
+# the lists are shared by the wrappers so they are only reset in place,
+# each one under its lock as the methods are called by several threads
+_call_statistics = {}
+_call_locks = {}
+_call_statistics_lock = threading.Lock()
+
+def get_call_statistics():
+    statistics = []
+    for name, stat in list(_call_statistics.items()):
+        with _call_locks[name]:
+            stat = tuple(stat)
+        if stat[0]:
+            statistics.append((name, stat))
+    return sorted(statistics)
+
+def reset_call_statistics():
+    for name, stat in list(_call_statistics.items()):
+        with _call_locks[name]:
+            stat[:] = [0, 0., 0.]
+
+## @brief wrap a method for the profiler and the call statistics
+#
+#@params name the call statistics name, default is the function name
+def profiled(func, name=None):
+    if name is None:
+        name = getattr(func, '__name__', repr(func))
+    with _call_statistics_lock:
+        lock = _call_locks.setdefault(name, threading.Lock())
+        stat = _call_statistics.setdefault(name, [0, 0., 0.])
+    assigned = [a for a in functools.WRAPPER_ASSIGNMENTS if hasattr(func, a)]
+    @functools.wraps(func, assigned=assigned)
+    def wrapper(*args, **kwargs):
+        t0 = _timer()
+        try:
+            if not profiler.active:
+                return func(*args, **kwargs)
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            dt = _timer() - t0
+            with lock:
+                stat[0] += 1
+                stat[1] += dt
+                if dt > stat[2]:
+                    stat[2] = dt
+    wrapper.profiled = True
+    return wrapper
+
+# the read_/write_attr_hardware methods are called once per request
+_NotAttributeMethods = ('read_attr_hardware', 'write_attr_hardware')
+
+def _is_attribute_method(name):
+    return (name.startswith('read_') or name.startswith('write_')) and \
+           name not in _NotAttributeMethods
+
+## @brief wrap a __getattr__ providing generic read_/write_ methods
+#
+# the methods returned are profiled, and replaced by the profiled ones
+# when cached in the instance dictionary (AttrHelper.get_attr_4u)
+def _profiled_getattr(getattr_func, class_name):
+    def __getattr__(self, name):
+        func = getattr_func(self, name)
+        if _is_attribute_method(name) and callable(func) and \
+           not getattr(func, 'profiled', False):
+            func = profiled(func, '%s.%s' % (class_name, name))
+            if name in self.__dict__:
+                self.__dict__[name] = func
+        return func
+    __getattr__.profiled = True
+    return __getattr__
+
+## @brief wrap the attribute and command methods of a Tango device class
+#
+# the methods inherited from the base classes, except the PyTango ones,
+# are wrapped too
+#@params cmd_names the command names (the keys of the class cmd_list)
+def instrument_device_class(klass, cmd_names):
+    members = {}
+    for cls in reversed(klass.__mro__):
+        if cls.__module__.split('.')[0] in ('PyTango', 'tango',
+                                             'builtins', '__builtin__'):
+            continue
+        members.update(vars(cls))
+    for name, func in list(members.items()):
+        if not callable(func) or isinstance(func, type) or \
+           getattr(func, 'profiled', False):
+            continue
+        if name == '__getattr__':
+            setattr(klass, name, _profiled_getattr(func, klass.__name__))
+        elif _is_attribute_method(name) or name in cmd_names:
+            setattr(klass, name, profiled(func, '%s.%s' % (klass.__name__, name)))
+
+## @brief wrap the callback methods of a Lima or processlib callback class
+#
+#@params method_names e.g. ('process',) for a sink task
+def instrument_callback_class(klass, method_names):
+    for name in method_names:
+        func = vars(klass).get(name)
+        if func is None or getattr(func, 'profiled', False):
+            continue
+        setattr(klass, name, profiled(func, '%s.%s' % (klass.__name__, name)))
+
+## @brief wrap the process method of the task classes of a plugin module
+#
+#@params task_classes the processlib task base classes
+def instrument_task_classes(module, task_classes):
+    for klass in list(vars(module).values()):
+        if isinstance(klass, type) and issubclass(klass, task_classes) and \
+           klass not in task_classes:
+            instrument_callback_class(klass, ('process',))
@@ -0,0 +1,280 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2017
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+#============================================================================
+#                              HELPERS
+#============================================================================
+#
+# Export of the images in a POSIX shared memory ring buffer, for the
+# consumers running on the same host. The segment (<directory>/<name>,
+# /dev/shm by default) starts with a header followed by NbSlots slots of SlotSize bytes:
+#
+#struct {
+  #unsigned int Magic= 0x4454534d;     // set to 0 when the segment is dropped
+  #unsigned short Version;
+  #unsigned short HeaderLength;
+  #unsigned int NbSlots;
+  #unsigned int SlotHeaderLength;
+  #unsigned long long SlotSize;        // slot header included
+  #unsigned long long WriteIndex;      // nb of frames written in the segment
+#} ShmRingHeaderStruct;
+#
+#struct {
+  #unsigned long long Sequence;        // odd while the slot is written
+  #long long FrameNumber;
+  #unsigned long long DataSize;        // size of the DATA_ARRAY
+  #double Timestamp;
+#} ShmSlotHeaderStruct;
+#
+# Each slot holds one frame as a plain DATA_ARRAY (header + pixels).
+# Frame WriteIndex - 1 is in slot (WriteIndex - 1) % NbSlots.
+# A reader copies a slot then checks that its Sequence is even and has not
+# changed during the copy, otherwise the slot was overwritten and the copy
+# must be dropped (sequence lock).
+#
+
+import os
+import mmap
+import struct
+import tempfile
+import threading
+import time
+
+import numpy
+
+ShmRingMagic = struct.unpack('>I', b'DTSM')[0]	# 0x4454534d
+ShmRingVersion = 1
+ShmRingPackStr = '<IHHIIQQ'
+ShmRingHeaderLen = 64
+ShmSlotPackStr = '<QqQd'
+ShmSlotHeaderLen = 32
+ShmWriteIndexOffset = struct.calcsize('<IHHIIQ')
+
+ShmDirectory = '/dev/shm'
+ShmSlotAlign = 4096
+
+## @brief the directory of the segments when none is configured
+#
+# /dev/shm if the host has it, the temporary directory otherwise
+def default_directory() :
+    if os.path.isdir(ShmDirectory):
+        return ShmDirectory
+    return tempfile.gettempdir()
+
+## @brief a shared memory ring of DATA_ARRAY frames
+class SharedMemoryRing:
+    def __init__(self, name, nb_slots, data_size, directory=None) :
+        self.__name = name
+        self.__directory = directory or default_directory()
+        self.__nb_slots = max(1, nb_slots)
+        data_size += ShmSlotHeaderLen
+        self.__slot_size = data_size + (-data_size % ShmSlotAlign)
+        self.__write_index = 0
+        self.__sequences = [0] * self.__nb_slots
+
+        size = ShmRingHeaderLen + self.__nb_slots * self.__slot_size
+        path = self.path()
+        if os.path.exists(path):
+            os.unlink(path)
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            self.__mmap = mmap.mmap(fd, size)
+            st = os.fstat(fd)
+            self.__file_id = (st.st_dev, st.st_ino)
+        finally:
+            os.close(fd)
+        struct.pack_into(ShmRingPackStr, self.__mmap, 0,
+                         ShmRingMagic,
+                         ShmRingVersion,
+                         ShmRingHeaderLen,
+                         self.__nb_slots,
+                         ShmSlotHeaderLen,
+                         self.__slot_size,
+                         0)
+
+    def path(self) :
+        return os.path.join(self.__directory, self.__name)
+
+    def name(self) :
+        return self.__name
+
+    def nb_slots(self) :
+        return self.__nb_slots
+
+    def slot_size(self) :
+        return self.__slot_size
+
+    def write_index(self) :
+        return self.__write_index
+
+    def fits(self, data_size) :
+        return data_size + ShmSlotHeaderLen <= self.__slot_size
+
+    ## @brief drop the segment
+    #
+    # readers still mapping it see a null magic. The file is only
+    # removed if it was not replaced by a newer segment of the same name
+    def close(self) :
+        struct.pack_into('<I', self.__mmap, 0, 0)
+        self.__mmap.close()
+        try:
+            st = os.stat(self.path())
+            if (st.st_dev, st.st_ino) == self.__file_id:
+                os.unlink(self.path())
+        except OSError:
+            pass
+
+    ## @brief write a frame in the next slot
+    #
+    #@params header the DATA_ARRAY header
+    #@params pixels the pixels numpy array
+    def write(self, frame_number, header, pixels) :
+        pixels = numpy.ascontiguousarray(pixels).reshape(-1).view(numpy.uint8)
+        data_size = len(header) + pixels.nbytes
+        index = self.__write_index
+        slot = index % self.__nb_slots
+        offset = ShmRingHeaderLen + slot * self.__slot_size
+        sequence = self.__sequences[slot] + 1
+        mm = self.__mmap
+
+        struct.pack_into('<Q', mm, offset, sequence)
+        data_offset = offset + ShmSlotHeaderLen
+        mm[data_offset:data_offset + len(header)] = header
+        data_offset += len(header)
+        dst = numpy.frombuffer(mm, numpy.uint8, pixels.nbytes, data_offset)
+        dst[:] = pixels
+        del dst
+        struct.pack_into(ShmSlotPackStr, mm, offset,
+                         sequence + 1,
+                         frame_number,
+                         data_size,
+                         time.time())
+        self.__sequences[slot] = sequence + 1
+
+        self.__write_index = index + 1
+        struct.pack_into('<Q', mm, ShmWriteIndexOffset, self.__write_index)
+
+## @brief export the frames of the acquisitions in a SharedMemoryRing
+#
+# the exporter thread is woken up by notify() with the last frame ready,
+# it exports the frames not yet exported, only keeping the last nb_slots
+# ones if it is late. The ring is only used and closed by this thread.
+class SharedMemoryExporter:
+    def __init__(self, name, nb_slots, export_frame, directory=None) :
+        self.__name = name
+        self.__directory = directory or default_directory()
+        self.__nb_slots = max(1, nb_slots)
+        # export_frame(frame_number, write) must call write(header, pixels)
+        self.__export_frame = export_frame
+        self.__ring = None
+        self.__cond = threading.Condition()
+        self.__last_ready = -1
+        self.__next_frame = 0
+        self.__acq_id = 0
+        self.__stopped = False
+        self.__thread = threading.Thread(target=self.__run,
+                                         name='SharedMemoryExport')
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    ## @brief notify the last frame ready
+    #
+    # a counter going backwards means a new acquisition
+    def notify(self, last_image_ready) :
+        with self.__cond:
+            if last_image_ready < self.__last_ready:
+                self.__next_frame = 0
+                self.__acq_id += 1
+            self.__last_ready = last_image_ready
+            self.__cond.notify()
+
+    ## @brief stop the export
+    #
+    # the thread closes the ring when it exits, which may be after
+    # the timeout if a frame export is still running
+    def stop(self, timeout=1.0) :
+        with self.__cond:
+            self.__stopped = True
+            self.__cond.notify()
+        self.__thread.join(timeout)
+
+    ## @brief the segment description for the readers
+    def descriptor(self) :
+        ring = self.__ring
+        if ring is None:
+            return {'name' : self.__name,
+                    'path' : os.path.join(self.__directory, self.__name),
+                    'slot_size' : 0,
+                    'nb_slots' : self.__nb_slots,
+                    'write_index' : 0}
+        return {'name' : ring.name(),
+                'path' : ring.path(),
+                'slot_size' : ring.slot_size(),
+                'nb_slots' : ring.nb_slots(),
+                'write_index' : ring.write_index()}
+
+    def __write(self, frame_number, header, pixels) :
+        data_size = len(header) + pixels.nbytes
+        ring = self.__ring
+        if ring is None or not ring.fits(data_size):
+            if ring is not None:
+                ring.close()
+            ring = SharedMemoryRing(self.__name, self.__nb_slots, data_size,
+                                    self.__directory)
+            self.__ring = ring
+        ring.write(frame_number, header, pixels)
+
+    def __run(self) :
+        try:
+            self.__export_loop()
+        finally:
+            ring = self.__ring
+            self.__ring = None
+            if ring is not None:
+                ring.close()
+
+    def __export_loop(self) :
+        while True:
+            with self.__cond:
+                while not self.__stopped and \
+                      self.__last_ready < self.__next_frame:
+                    self.__cond.wait()
+                if self.__stopped:
+                    break
+                acq_id = self.__acq_id
+                last_ready = self.__last_ready
+                first = max(self.__next_frame, last_ready - self.__nb_slots + 1)
+            try:
+                for frame_number in range(first, last_ready + 1):
+                    if self.__stopped:
+                        return
+                    self.__export_frame(frame_number,
+                                        lambda header, pixels, n=frame_number:
+                                        self.__write(n, header, pixels))
+            except:
+                import traceback
+                traceback.print_exc()
+            with self.__cond:
+                if acq_id == self.__acq_id:
+                    self.__next_frame = last_ready + 1
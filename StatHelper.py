@@ -0,0 +1,111 @@
+############################################################################
+# This file is part of LImA, a Library for Image Acquisition
+#
+# Copyright (C) : 2009-2017
+# European Synchrotron Radiation Facility
+# CS40220 38043 Grenoble Cedex 9
+# FRANCE
+# Contact: lima@esrf.fr
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+############################################################################
+
+#============================================================================
+#                              HELPERS
+#============================================================================
+#
+# Per-frame pipeline timing.
+# The image status callback gives the last frame of each stage, a frame
+# reaching a stage between two callbacks gets the time of the second one.
+# The timestamps of the last frames are kept in a fixed-size ring.
+#
+
+import threading
+
+import numpy
+
+Stages = ('acquired', 'base_ready', 'ready', 'counter_ready', 'saved')
+DefaultRingSize = 1024
+
+## @brief record the time each frame reaches each stage
+class FrameLatencyRecorder:
+    def __init__(self, size=DefaultRingSize):
+        self.__size = max(1, size)
+        self.__lock = threading.Lock()
+        self.__frames = numpy.empty(self.__size, dtype=numpy.int64)
+        self.__times = numpy.empty((self.__size, len(Stages)),
+                                   dtype=numpy.float64)
+        self.reset()
+
+    def reset(self):
+        with self.__lock:
+            self.__frames.fill(-1)
+            self.__times.fill(numpy.nan)
+            self.__last = [-1] * len(Stages)
+
+    ## @brief record an image status
+    #
+    #@params counters the last frame of each stage, in Stages order
+    # a counter going backwards means a new acquisition
+    def update(self, timestamp, counters):
+        with self.__lock:
+            if any([c < l for c, l in zip(counters, self.__last)]):
+                self.__frames.fill(-1)
+                self.__times.fill(numpy.nan)
+                self.__last = [-1] * len(Stages)
+            for stage, counter in enumerate(counters):
+                last = self.__last[stage]
+                if counter <= last:
+                    continue
+                first = max(last + 1, counter - self.__size + 1)
+                frames = numpy.arange(first, counter + 1)
+                index = frames % self.__size
+                if stage == 0:
+                    self.__frames[index] = frames
+                    self.__times[index] = numpy.nan
+                else:
+                    # a stage lagging by more than the ring size must
+                    # not stamp the rows of newer frames
+                    valid = self.__frames[index] == frames
+                    index = index[valid]
+                self.__times[index, stage] = timestamp
+                self.__last[stage] = counter
+
+    ## @brief get the ring content ordered by frame number
+    #
+    #@return the frame numbers and the (frames x Stages) timestamps,
+    # NaN when a stage is not reached
+    def dump(self):
+        with self.__lock:
+            valid = self.__frames >= 0
+            frames = self.__frames[valid]
+            times = self.__times[valid]
+        order = numpy.argsort(frames)
+        return frames[order], times[order]
+
+    ## @brief latency of a stage from the acquisition
+    #
+    #@return p50, p99 and max in second, NaN if no frame reached the stage
+    def stage_stats(self, stage):
+        frames, times = self.dump()
+        if stage == 'acquired':
+            # frame period of the detector
+            latency = numpy.diff(times[:, 0])
+        else:
+            latency = times[:, Stages.index(stage)] - times[:, 0]
+        latency = latency[numpy.isfinite(latency)]
+        if not len(latency):
+            return [numpy.nan] * 3
+        p50, p99 = numpy.percentile(latency, (50, 99))
+        return [float(p50), float(p99), float(latency.max())]
@@ -32,24 +32,13 @@ from Lima import Core
 from Lima.Server.plugins.Utils import BasePostProcess
 
 
-# PIL an StringIO, py2 vs. py3 
-try:
-    import Image
-except ImportError:
-    from PIL import Image
-
-try:
-    from cString import StringIO
-except ImportError:
-    from io import BytesIO as StringIO
-    
-# 3-4x faster jpeg encoding than PIL
-# https://github.com/lilohuang/PyTurboJPEG
-try:
-    from turbojpeg import TurboJPEG, TJPF_RGB
-    turbo_jpeg = TurboJPEG()
-except ImportError:
-    turbo_jpeg = None
+# PIL, StringIO and PyTurboJPEG (3-4x faster jpeg encoding than PIL),
+# found once for the image preview and this plugin
+from Lima.Server.PreviewHelper import Image, StringIO, turbo_jpeg
+if Image is None:
+    raise ImportError('Bpm needs PIL')
+if turbo_jpeg is not None:
+    from turbojpeg import TJPF_RGB
 
 import base64
 import math
@@ -199,6 +188,13 @@ class BpmDeviceServer(BasePostProcess):
         return x
 
     def getResults(self, from_index=0) :
+        return self._get_result_rows(from_index).ravel()
+
+    ##@brief history results from a frame number, one row per frame
+    #
+    #@return a 2D array with the columns
+    # (timestamp,intensity,x,y,fwhm_x,fwhm_y,frame)
+    def _get_result_rows(self, from_index=0) :
         results = self._bpmManager.getHistory(from_index)
         result_array = numpy.zeros((len(results),7))
         dim = _control_ref().image().getImageDim().getSize()
@@ -212,7 +208,12 @@ class BpmDeviceServer(BasePostProcess):
             result_array[i][4] = self.validate_number(r.beam_fwhm_x, fallback_value=0) * self.calibration[0]
             result_array[i][5] = self.validate_number(r.beam_fwhm_y, fallback_value=0) * self.calibration[1]
             result_array[i][6] = r.frameNumber
-        return result_array.ravel()
+        return result_array
+
+    def get_frame_results(self, first, last) :
+        rows = self._get_result_rows(first)
+        rows = rows[rows[:,6] < last]
+        return (['timestamp','intensity','x','y','fwhm_x','fwhm_y','frame'], rows)
 
     def GetPixelIntensity(self, coordinate):
         x=coordinate[0] ; y=coordinate[1]
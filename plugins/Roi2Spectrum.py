@@ -34,6 +34,12 @@ def grouper(n, iterable, padvalue=None):
 
 Roi2SpectrumTask = Core.Processlib.Tasks.Roi2SpectrumTask
 
+RoiMode2String = {
+    Roi2SpectrumTask.COLUMN_SUM: 'COLUMN_SUM',
+    Roi2SpectrumTask.LINES_SUM:  'LINES_SUM',
+}
+String2RoiMode = dict([(v, k) for k, v in RoiMode2String.items()])
+
 #==================================================================
 #   Roi2spectrum Class Description:
 #
@@ -146,12 +152,10 @@ class Roi2spectrumDeviceServer(BasePostProcess) :
         if self.__roi2spectrumMgr is None:
             raise RuntimeError('should start the device first')
         roi_list = []
-        rois_names =  self.__roi2spectrumMgr.getRois()
+        rois_names = dict(self.__roi2spectrumMgr.getRois())
         for roi_name in argin:
-            for name, roi in rois_names:
-                if name == roi_name:
-                    break
-            else:
+            roi = rois_names.get(roi_name)
+            if roi is None:
                 raise ValueError('Roi %s not defined yet' % roi_name)
             roi_id = self.__roiName2ID[roi_name]
             x, y = roi.getTopLeft().x, roi.getTopLeft().y
@@ -163,26 +167,16 @@ class Roi2spectrumDeviceServer(BasePostProcess) :
         if self.__roi2spectrumMgr is None:
             raise RuntimeError('should start the device first')
         roi_mode_list = []
-        rois_modes = self.__roi2spectrumMgr.getRoiModes()
+        rois_modes = dict(self.__roi2spectrumMgr.getRoiModes())
         for roi_name in argin:
-            for name, roi_mode in rois_modes:
-                if name == roi_name:
-                    break
-            else:
+            roi_mode = rois_modes.get(roi_name)
+            if roi_mode is None:
                 raise ValueError('Roi %s not defined yet' % roi_name)
-            roi_mode_map = {
-                Roi2SpectrumTask.COLUMN_SUM: 'COLUMN_SUM',
-                Roi2SpectrumTask.LINES_SUM:  'LINES_SUM',
-            }
-            roi_mode_list.append(roi_mode_map[roi_mode])
+            roi_mode_list.append(RoiMode2String[roi_mode])
         return roi_mode_list
 
     def setRoiModes(self,argin) :
-        roi_mode_map = {
-            'COLUMN_SUM': Roi2SpectrumTask.COLUMN_SUM,
-            'LINES_SUM':  Roi2SpectrumTask.LINES_SUM,
-        }
-        rois_modes = [(n, roi_mode_map[m]) for n,m in  grouper(2, argin)]
+        rois_modes = [(n, String2RoiMode[m]) for n,m in  grouper(2, argin)]
         self.__roi2spectrumMgr.setRoiModes(rois_modes)
 
     def clearAllRois(self):
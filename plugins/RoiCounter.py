@@ -21,9 +21,13 @@
 ############################################################################
 
 import itertools
+import operator
 import weakref
 import PyTango
 import sys
+import time
+import struct
+import threading
 import numpy
 import processlib
 from Lima import Core
@@ -34,6 +38,42 @@ def grouper(n, iterable, padvalue=None):
 
 RoiCounterTask = Core.Processlib.Tasks.RoiCounterTask
 
+RoiType2String = {
+    RoiCounterTask.SQUARE: 'SQUARE',
+    RoiCounterTask.ARC:    'ARC',
+    RoiCounterTask.MASK:   'MASK',
+    RoiCounterTask.LUT:    'LUT',
+}
+
+# importRois/exportRois table columns
+RoiTableColumns = ['roi_id','type','p0','p1','p2','p3','p4','p5']
+
+# max size of the Counters attribute (header + 7 columns rows)
+CountersMaxSize = 3 + 7 * 1024 * 1024
+
+# The ROI_COUNTERS definition (readCountersColumns)
+#struct {
+  #unsigned int Magic= 0x52434e54;
+  #unsigned short Version;
+  #unsigned short HeaderLength;
+  #unsigned int NbRois;
+  #unsigned int NbResultsPerRoi;
+#} RoiCountersHeaderStruct;
+# followed by NbRois x NbResultsPerRoi values of each column, roi after roi:
+# roi_id and frame as little endian int32, sum, avg, std, min and max as
+# little endian float64
+RoiCountersVersion = 1
+RoiCountersPackStr = '<IHHII'
+RoiCountersMagic = struct.unpack('>I', b'RCNT')[0]	# 0x52434e54
+RoiCountersHeaderLen = struct.calcsize(RoiCountersPackStr)
+RoiCountersColumns = [('roi_id','<i4'),('frame','<i4'),
+                      ('sum','<f8'),('avg','<f8'),('std','<f8'),
+                      ('min','<f8'),('max','<f8')]
+
+# (frame,sum,avg,std,min,max) of a RoiCounterTask result
+_getResultColumns = operator.attrgetter('frameNumber','sum','average',
+                                        'std','minValue','maxValue')
+
 #==================================================================
 #   RoiCounter Class Description:
 #
@@ -45,6 +85,7 @@ class RoiCounterDeviceServer(BasePostProcess) :
 
 #--------- Add you global variables here --------------------------
     ROI_COUNTER_TASK_NAME = "RoiCounterTask"
+    COUNTERS_TASK_NAME = "RoiCounterEventTask"
 #------------------------------------------------------------------
 #    Device constructor
 #------------------------------------------------------------------
@@ -53,6 +94,14 @@ class RoiCounterDeviceServer(BasePostProcess) :
         self.__roiName2ID = {}
         self.__roiID2Name = {}
         self.__currentRoiId = 0
+        self.__cursors = {}
+        self.__eventCursor = None
+        self.__eventLock = threading.Lock()
+        self.__acqTracker = AcqTracker()
+        self.__countersTask = None
+        self.__lastCounters = numpy.zeros(3,dtype = numpy.double)
+        self.__eventNbFrames = 100
+        self.__eventPeriod = 100.
         BasePostProcess.__init__(self,cl,name)
         RoiCounterDeviceServer.init_device(self)
         try:
@@ -75,12 +124,33 @@ class RoiCounterDeviceServer(BasePostProcess) :
         except AttributeError:
             pass
 
+    ##@brief a new acquisition is prepared, restart the cursors
+    def acq_prepared(self,last_frame) :
+        self.__acqTracker.restart(last_frame)
+
+    def init_device(self):
+        BasePostProcess.init_device(self)
+        if self.enable_tango_event:
+            self.set_change_event('Counters', True, False)
+
     def set_state(self,state) :
         if(state == PyTango.DevState.OFF) :
             if(self.__roiCounterMgr) :
-                self.__roiCounterMgr = None
                 ctControl = _control_ref()
                 extOpt = ctControl.externalOperation()
+                if self.__countersTask:
+                    # the pushing thread may wait for the device monitor
+                    # held by this command: bounded join, and the last
+                    # results are pushed from here
+                    self.__countersTask.stop()
+                    self.__countersTask = None
+                    extOpt.delOp(self.COUNTERS_TASK_NAME)
+                    try:
+                        self.push_counters()
+                    except:
+                        import traceback
+                        traceback.print_exc()
+                self.__roiCounterMgr = None
                 extOpt.delOp(self.ROI_COUNTER_TASK_NAME)
         elif(state == PyTango.DevState.ON) :
             if not self.__roiCounterMgr:
@@ -88,7 +158,15 @@ class RoiCounterDeviceServer(BasePostProcess) :
                 extOpt = ctControl.externalOperation()
                 self.__roiCounterMgr = extOpt.addOp(Core.ROICOUNTERS,self.ROI_COUNTER_TASK_NAME,
                                                     self._runLevel)
+                if self.enable_tango_event:
+                    self.__eventCursor = None
+                    self.__countersTask = CountersEventTask(self)
+                    handler = extOpt.addOp(Core.USER_SINK_TASK,
+                                           self.COUNTERS_TASK_NAME,self._runLevel+1)
+                    handler.setSinkTask(self.__countersTask)
+            lastFrame = self.__roiCounterMgr.getCounterStatus()
             self.__roiCounterMgr.clearCounterStatus()
+            self.__acqTracker.restart(lastFrame)
 
         PyTango.LatestDeviceImpl.set_state(self,state)
 
@@ -116,6 +194,67 @@ class RoiCounterDeviceServer(BasePostProcess) :
         attr.set_value(value_read)
 
 
+#------------------------------------------------------------------
+#    Read Counters attribute
+#------------------------------------------------------------------
+    def read_Counters(self, attr):
+        attr.set_value(self.__lastCounters)
+
+#------------------------------------------------------------------
+#    Read/Write EventNbFrames attribute
+#------------------------------------------------------------------
+    def read_EventNbFrames(self, attr):
+        attr.set_value(self.__eventNbFrames)
+
+    def write_EventNbFrames(self, attr):
+        data = attr.get_write_value()
+        self.__eventNbFrames = max(1,data)
+
+    def is_EventNbFrames_allowed(self,mode) :
+        return True
+
+#------------------------------------------------------------------
+#    Read/Write EventPeriod attribute
+#------------------------------------------------------------------
+    def read_EventPeriod(self, attr):
+        attr.set_value(self.__eventPeriod)
+
+    def write_EventPeriod(self, attr):
+        data = attr.get_write_value()
+        self.__eventPeriod = max(0.,data)
+
+    def is_EventPeriod_allowed(self,mode) :
+        return True
+
+    def event_settings(self) :
+        return self.__eventNbFrames,self.__eventPeriod / 1000.
+
+    ##@brief push the results added since the last push
+    #
+    # called by the CountersEventTask pushing thread
+    # the results over CountersMaxSize are pushed in several events,
+    # each one with a range of frames of all the rois
+    def push_counters(self) :
+        roiCounterMgr = self.__roiCounterMgr
+        if roiCounterMgr is None:
+            return
+        with self.__eventLock:
+            cursor = self.__eventCursor or (self.__acqTracker.acq_id(),0)
+            minListSize,overrun,nbLost,rows,self.__eventCursor = \
+                self._read_cursor(cursor,roiCounterMgr)
+        if not minListSize:
+            return
+        nbRois = len(rows) // minListSize
+        chunkSize = max(1,(CountersMaxSize - 3) // (7 * nbRois))
+        blocks = rows.reshape(nbRois,minListSize,7)
+        for first in range(0,minListSize,chunkSize):
+            chunk = blocks[:,first:first + chunkSize].reshape(-1,7)
+            # the lost frames are reported by the first event
+            self.__lastCounters = _pack_counters(len(chunk) // nbRois,
+                                                 overrun,nbLost,chunk)
+            overrun,nbLost = False,0
+            self.push_change_event('Counters',self.__lastCounters)
+
 #==================================================================
 #
 #    RoiCounter command methods
@@ -180,33 +319,23 @@ class RoiCounterDeviceServer(BasePostProcess) :
     def getRoiTypes(self,argin):
         if self.__roiCounterMgr is None:
             raise RuntimeError('should start the device first')
+        rois_types = dict(self.__roiCounterMgr.getTypes())
         roi_type_list = []
-        rois_types = self.__roiCounterMgr.getTypes()
         for roi_name in argin:
-            for name, roi_type in rois_types:
-                if name == roi_name:
-                    break
-            else:
+            roi_type = rois_types.get(roi_name)
+            if roi_type is None:
                 raise ValueError('Roi %s not defined yet' % roi_name)
-            roi_type_map = {
-                RoiCounterTask.SQUARE: 'SQUARE',
-                RoiCounterTask.ARC:    'ARC',
-                RoiCounterTask.MASK:   'MASK',
-                RoiCounterTask.LUT:    'LUT',
-            }
-            roi_type_list.append(roi_type_map[roi_type])
+            roi_type_list.append(RoiType2String[roi_type])
         return roi_type_list
 
     def getRois(self,argin):
         if self.__roiCounterMgr is None:
             raise RuntimeError('should start the device first')
         roi_list = []
-        rois_names =  self.__roiCounterMgr.getRois()
+        rois_names = dict(self.__roiCounterMgr.getRois())
         for roi_name in argin:
-            for name, roi in rois_names:
-                if name == roi_name:
-                    break
-            else:
+            roi = rois_names.get(roi_name)
+            if roi is None:
                 raise ValueError('Roi %s not defined yet' % roi_name)
             roi_id = self.__roiName2ID[roi_name]
             x, y = roi.getTopLeft().x, roi.getTopLeft().y
@@ -219,12 +348,10 @@ class RoiCounterDeviceServer(BasePostProcess) :
         if self.__roiCounterMgr is None:
             raise RuntimeError('should start the device first')
         roi_list = []
-        rois_names =  self.__roiCounterMgr.getArcRois()
+        rois_names = dict(self.__roiCounterMgr.getArcRois())
         for roi_name in argin:
-            for name, roi in rois_names:
-                if name == roi_name:
-                    break
-            else:
+            roi = rois_names.get(roi_name)
+            if roi is None:
                 raise ValueError('Roi %s not defined yet' % roi_name)
             roi_id = self.__roiName2ID[roi_name]
             x, y = roi.getCenter()
@@ -235,6 +362,69 @@ class RoiCounterDeviceServer(BasePostProcess) :
         roi_list_flat = list(itertools.chain(*roi_list))
         return numpy.array(roi_list_flat, numpy.float64)
 
+    ##@brief define a set of square and arc rois in one call
+    #
+    # the rois are named, added if needed and set with one updateRois and
+    # one updateArcRois call.
+    #@params argin rows of [roi_id,type,p0..p5] (the exportRois format),
+    # the roi_id column is ignored, and the roi names.
+    # SQUARE: x,y,width,height,0,0 ARC: x,y,r1,r2,start,end
+    #@return the roi ids
+    def importRois(self,argin) :
+        if self.__roiCounterMgr is None:
+            raise RuntimeError('should start the device first')
+        values,names = argin
+        nbColumns = len(RoiTableColumns)
+        if len(values) != nbColumns * len(names):
+            raise AttributeError('should be %d values per roi name' % nbColumns)
+        table = numpy.asarray(values,dtype = numpy.double).reshape(-1,nbColumns)
+        roi_list = []
+        arc_list = []
+        for roi_name,row in zip(names,table.tolist()):
+            roi_type = int(row[1])
+            if roi_type == RoiCounterTask.SQUARE:
+                x,y,width,height = [int(v) for v in row[2:6]]
+                roi_list.append((roi_name.encode(),Core.Roi(x,y,width,height)))
+            elif roi_type == RoiCounterTask.ARC:
+                arc_list.append((roi_name,Core.ArcRoi(*row[2:8])))
+            else:
+                raise ValueError('Roi %s: only SQUARE and ARC rois can be imported' % roi_name)
+        roi_ids = self.addNames(names)
+        if roi_list:
+            self.__roiCounterMgr.updateRois(roi_list)
+        if arc_list:
+            self.__roiCounterMgr.updateArcRois(arc_list)
+        return roi_ids
+
+    ##@brief the definition of a set of rois in one call
+    #
+    #@params argin roi names, all the rois if empty
+    #@return rows of [roi_id,type,p0..p5] and the roi names,
+    # the MASK and LUT rois have null parameters
+    def exportRois(self,argin) :
+        if self.__roiCounterMgr is None:
+            raise RuntimeError('should start the device first')
+        rois_types = dict(self.__roiCounterMgr.getTypes())
+        names = list(argin) or [name for name in self.__roiCounterMgr.getNames()
+                                if name in self.__roiName2ID]
+        squares = dict(self.__roiCounterMgr.getRois())
+        arcs = dict(self.__roiCounterMgr.getArcRois())
+        table = numpy.zeros((len(names),len(RoiTableColumns)),dtype = numpy.double)
+        for row,roi_name in zip(table,names):
+            roi_type = rois_types.get(roi_name)
+            if roi_type is None:
+                raise ValueError('Roi %s not defined yet' % roi_name)
+            row[0] = self.__roiName2ID[roi_name]
+            row[1] = int(roi_type)
+            if roi_type == RoiCounterTask.SQUARE:
+                roi = squares[roi_name]
+                row[2:6] = (roi.getTopLeft().x, roi.getTopLeft().y,
+                            roi.getSize().getWidth(), roi.getSize().getHeight())
+            elif roi_type == RoiCounterTask.ARC:
+                roi = arcs[roi_name]
+                row[2:8] = list(roi.getCenter()) + list(roi.getRayons()) + list(roi.getAngles())
+        return table.ravel(),names
+
     def get_current_config(self):
         try:
             returnDict = {}
@@ -326,31 +516,196 @@ class RoiCounterDeviceServer(BasePostProcess) :
         self.__roiCounterMgr.setMask(mask)
 
     def readCounters(self,argin) :
-        roiResultCounterList = self.__roiCounterMgr.readCounters(argin)
+        minListSize,rows = self._read_counter_rows(argin)
+        if minListSize :
+            returnArray = rows.ravel()
+            returnArray[0] = float(minListSize)
+            return returnArray
+        return numpy.array([],dtype = numpy.double)
+
+    ##@brief counter results from a frame number, one row per result
+    #
+    # each roi returns the same number of results (the shortest list)
+    #@return the nb of results per roi and a 2D array with the columns
+    # (roi_id,frame,sum,avg,std,min,max)
+    def _read_counter_rows(self,from_frame,roiCounterMgr = None) :
+        if roiCounterMgr is None:
+            roiCounterMgr = self.__roiCounterMgr
+        roiResultCounterList = roiCounterMgr.readCounters(from_frame)
         if roiResultCounterList:
             minListSize = len(roiResultCounterList[0][1])
             for roiName,resultList in roiResultCounterList:
                 if minListSize > len(resultList):
                     minListSize = len(resultList)
 
-
             if minListSize :
-                returnArray = numpy.zeros(minListSize * len(roiResultCounterList) * 7,dtype = numpy.double)
-                returnArray[0] = float(minListSize)
-                indexArray = 0
-                for roiName,resultList in roiResultCounterList:
-                    roi_id = self.__roiName2ID.get(roiName)
-                    for result in resultList[:minListSize] :
-                        returnArray[indexArray:indexArray+7] = (float(roi_id),
-                                                                float(result.frameNumber),
-                                                                result.sum,
-                                                                result.average,
-                                                                result.std,
-                                                                result.minValue,
-                                                                result.maxValue)
-                        indexArray += 7
-                return returnArray
-        return numpy.array([],dtype = numpy.double)
+                rows = numpy.empty((minListSize * len(roiResultCounterList),7),
+                                   dtype = numpy.double)
+                for i,(roiName,resultList) in enumerate(roiResultCounterList):
+                    block = rows[i * minListSize:(i + 1) * minListSize]
+                    block[:,0] = self.__roiName2ID.get(roiName)
+                    # the processlib binding has no columnar accessor yet,
+                    # so the results are still fetched one by one
+                    block[:,1:] = list(map(_getResultColumns,resultList[:minListSize]))
+                return minListSize,rows
+        return 0,numpy.zeros((0,7),dtype = numpy.double)
+
+    ##@brief counter results from a frame number, in typed columns
+    #
+    # unlike readCounters no value is overwritten and the ids and frame
+    # numbers are integers, see the ROI_COUNTERS definition
+    def readCountersColumns(self,argin) :
+        minListSize,rows = self._read_counter_rows(argin)
+        nbRois = minListSize and len(rows) // minListSize
+        header = struct.pack(RoiCountersPackStr,
+                             RoiCountersMagic,
+                             RoiCountersVersion,
+                             RoiCountersHeaderLen,
+                             nbRois,
+                             minListSize)
+        columns = [numpy.ascontiguousarray(rows[:,i],dtype = dtype).tobytes()
+                   for i,(name,dtype) in enumerate(RoiCountersColumns)]
+        return 'ROI_COUNTERS',header + b''.join(columns)
+
+    ##@brief register a named read cursor, at the first frame
+    def registerCursor(self,name) :
+        self.__cursors[name] = (self.__acqTracker.acq_id(),0)
+
+    def unregisterCursor(self,name) :
+        if self.__cursors.pop(name,None) is None:
+            raise ValueError('Cursor %s not registered' % name)
+
+    ##@brief read the results added since the last read of a cursor
+    #
+    # the frames which left the BufferSize ring before being read are
+    # counted as lost, as well as the unread frames of an acquisition
+    # followed by a new one. The cursor then restarts at its first frame.
+    #@return nb results per roi,overrun flag,nb lost frames followed by
+    # the readCounters rows
+    def readCountersCursor(self,name) :
+        cursor = self.__cursors.get(name)
+        if cursor is None:
+            raise ValueError('Cursor %s not registered' % name)
+        minListSize,overrun,nbLost,rows,self.__cursors[name] = \
+            self._read_cursor(cursor,self.__roiCounterMgr)
+        return _pack_counters(minListSize,overrun,nbLost,rows)
+
+    ##@brief read the new results of a cursor (acq_id,next frame)
+    #
+    #@return nb results per roi,overrun flag,nb lost frames,the rows
+    # and the new cursor
+    def _read_cursor(self,cursor,roiCounterMgr) :
+        if roiCounterMgr is None:
+            raise RuntimeError('should start the device first')
+        acqId,nextFrame = cursor
+        overrun = False
+        nbLost = 0
+        currentAcqId,previousLastFrame = self.__acqTracker.state()
+        if acqId != currentAcqId:
+            # the previous acquisitions are not readable any more
+            if acqId == currentAcqId - 1:
+                nbLost = max(0,previousLastFrame + 1 - nextFrame)
+                overrun = nbLost > 0
+            else:
+                overrun = True
+            acqId,nextFrame = currentAcqId,0
+        minListSize,rows = self._read_counter_rows(nextFrame,roiCounterMgr)
+        if minListSize :
+            firstFrames = rows[::minListSize,1]
+            nbLostInRing = max(0,int(firstFrames.max()) - nextFrame)
+            nbLost += nbLostInRing
+            overrun = overrun or nbLostInRing > 0
+            nextFrame = int(rows[minListSize - 1,1]) + 1
+        return minListSize,overrun,nbLost,rows,(acqId,nextFrame)
+
+    def get_frame_results(self,first,last) :
+        minListSize,rows = self._read_counter_rows(first)
+        rows = rows[rows[:,1] < last]
+        return (['roi_id','frame','sum','avg','std','min','max'],rows)
+
+##@brief the readCountersCursor and Counters array
+def _pack_counters(minListSize,overrun,nbLost,rows) :
+    returnArray = numpy.empty(3 + rows.size,dtype = numpy.double)
+    returnArray[:3] = (minListSize,overrun,nbLost)
+    returnArray[3:] = rows.ravel()
+    return returnArray
+
+##@brief acquisition counter of the cursors
+#
+# the frame numbers restart at 0 with each acquisition, the acquisitions
+# are counted by LimaCCDs.prepareAcq (acq_prepared) and by Start, once the
+# results of the previous acquisition are cleared
+class AcqTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._acq_id = 0
+        self._previous_last_frame = -1
+
+    def acq_id(self):
+        return self._acq_id
+
+    ##@brief (acquisition id,last frame of the previous acquisition)
+    def state(self):
+        with self._lock:
+            return self._acq_id,self._previous_last_frame
+
+    def restart(self,last_frame):
+        with self._lock:
+            self._acq_id += 1
+            self._previous_last_frame = last_frame
+
+##@brief sink task pushing the Counters events
+#
+# the pushing thread pushes the new results every EventNbFrames frames
+# or EventPeriod ms, whichever comes first
+class CountersEventTask(Core.Processlib.SinkTaskBase):
+    def __init__(self, device):
+        Core.Processlib.SinkTaskBase.__init__(self)
+        self._device = weakref.ref(device)
+        self._lock = threading.Condition()
+        self._nb_new_frames = 0
+        self._stop = False
+        self._pushing_thread = threading.Thread(target=self._push_loop,
+                                                name='RoiCounterEvent')
+        self._pushing_thread.daemon = True
+        self._pushing_thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._stop = True
+            self._lock.notify()
+        self._pushing_thread.join(1.0)
+
+    def process(self, data):
+        with self._lock:
+            self._nb_new_frames += 1
+            self._lock.notify()
+
+    def _push_loop(self):
+        while True:
+            with self._lock:
+                while self._nb_new_frames == 0 and not self._stop:
+                    self._lock.wait()
+                if self._stop:
+                    break
+                device = self._device()
+                if device is None:
+                    break
+                nb_frames,period = device.event_settings()
+                deadline = time.time() + period
+                while (self._nb_new_frames < nb_frames and
+                       not self._stop):
+                    timeout = deadline - time.time()
+                    if timeout <= 0:
+                        break
+                    self._lock.wait(timeout)
+                self._nb_new_frames = 0
+            try:
+                device.push_counters()
+            except:
+                import traceback
+                traceback.print_exc()
+            del device
 
 #==================================================================
 #
@@ -366,6 +721,10 @@ class RoiCounterDeviceServerClass(PyTango.DeviceClass):
 
     #	 Device Properties
     device_property_list = {
+        "enable_tango_event":
+        [PyTango.DevBoolean,
+         "Enable or disable the push event on Counters attribute",
+        False],
         }
 
 
@@ -395,6 +754,12 @@ class RoiCounterDeviceServerClass(PyTango.DeviceClass):
         'getArcRois':
         [[PyTango.DevVarStringArray,"rois alias"],
          [PyTango.DevVarDoubleArray,"roi vector [roi arc vector [roi_id,centerX,centerY,rayon1,rayon2,angle_start,angle_end,...]"]],
+        'importRois':
+        [[PyTango.DevVarDoubleStringArray,"[roi_id,type,p0,...,p5,...],[roi names]"],
+         [PyTango.DevVarLongArray,"rois' id"]],
+        'exportRois':
+        [[PyTango.DevVarStringArray,"rois alias, all if empty"],
+         [PyTango.DevVarDoubleStringArray,"[roi_id,type,p0,...,p5,...],[roi names]"]],
         'clearAllRois':
         [[PyTango.DevVoid,""],
          [PyTango.DevVoid,""]],
@@ -404,6 +769,18 @@ class RoiCounterDeviceServerClass(PyTango.DeviceClass):
         'readCounters':
         [[PyTango.DevLong,"from which frame"],
          [PyTango.DevVarDoubleArray,"roi_id,frame number,sum,average,std,min,max,..."]],
+        'readCountersColumns':
+        [[PyTango.DevLong,"from which frame"],
+         [PyTango.DevEncoded,"ROI_COUNTERS header,roi_id,frame,sum,average,std,min,max columns"]],
+        'registerCursor':
+        [[PyTango.DevString,"cursor name"],
+         [PyTango.DevVoid,""]],
+        'unregisterCursor':
+        [[PyTango.DevString,"cursor name"],
+         [PyTango.DevVoid,""]],
+        'readCountersCursor':
+        [[PyTango.DevString,"cursor name"],
+         [PyTango.DevVarDoubleArray,"nb results per roi,overrun,nb lost frames,roi_id,frame number,sum,average,std,min,max,..."]],
         'Start':
         [[PyTango.DevVoid,""],
          [PyTango.DevVoid,""]],
@@ -427,6 +804,19 @@ class RoiCounterDeviceServerClass(PyTango.DeviceClass):
             [[PyTango.DevLong,
             PyTango.SCALAR,
             PyTango.READ_WRITE]],
+        'Counters':
+            [[PyTango.DevDouble,
+            PyTango.SPECTRUM,
+            PyTango.READ, CountersMaxSize]],
+        'EventNbFrames':
+            [[PyTango.DevLong,
+            PyTango.SCALAR,
+            PyTango.READ_WRITE]],
+        'EventPeriod':
+            [[PyTango.DevDouble,
+            PyTango.SCALAR,
+            PyTango.READ_WRITE],
+            {'unit': 'ms'}],
         }
 
 
@@ -95,6 +95,22 @@ class BasePostProcess(PyTango.LatestDeviceImpl) :
     def Stop(self) :
         self.set_state(PyTango.DevState.OFF)
 
+    ##@brief results of the plugin for a frame range
+    #
+    # used by LimaCCDs to bundle the plugin results with the images
+    #@params first first frame number
+    #@params last last frame number (excluded)
+    #@return (column names, 2D float64 array with one row per result)
+    # or None if the plugin has no per-frame results
+    def get_frame_results(self, first, last) :
+        return None
+
+    ##@brief called by LimaCCDs.prepareAcq once the acquisition is prepared
+    #
+    #@params last_frame the last frame processed in the previous acquisition
+    def acq_prepared(self, last_frame) :
+        pass
+
 #------------------------------------------------------------------
 #    Read RunLevel attribute
 #------------------------------------------------------------------